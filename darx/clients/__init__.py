@@ -1,6 +1,6 @@
 """DARX Site Generator - Client modules"""
 
-from .vertex_ai import generate_site_code
+from .vertex_ai import generate_site_code, generate_site_code_async, generate_sites_batch
 from .github import create_github_repo, push_to_github
 from .vercel import deploy_to_vercel
 from .builder_io import create_space, register_components, create_initial_page
@@ -8,6 +8,8 @@ from .gcp import store_backup, log_generation
 
 __all__ = [
     'generate_site_code',
+    'generate_site_code_async',
+    'generate_sites_batch',
     'create_github_repo',
     'push_to_github',
     'deploy_to_vercel',
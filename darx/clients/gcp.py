@@ -4,19 +4,43 @@ GCP operations: Cloud Storage and Supabase logging
 
 import os
 import json
+import gzip
 import zipfile
 import io
+import logging
+import msgspec
 from datetime import datetime
 from google.cloud import storage
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 # Import Supabase client from darx_core
 from darx_core import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 PROJECT_ID = os.getenv('GCP_PROJECT', 'sylvan-journey-474401-f9')
 BUCKET_NAME = os.getenv('GCS_BUCKET', 'darx-generated-sites')
 
+# Pub/Sub payload compression - off unless PUBSUB_COMPRESSION=gzip, since every subscriber
+# has to understand the codec attribute before it can be turned on
+PUBSUB_COMPRESSION = os.getenv('PUBSUB_COMPRESSION', '').lower() == 'gzip'
+PUBSUB_COMPRESSION_MIN_BYTES = 512  # smaller bodies don't shrink enough to be worth it
+
+
+def encode_pubsub_message(message_data: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Encode a Pub/Sub message body as JSON, gzipped when compression is enabled
+
+    Returns:
+        (data, attributes) - attributes carries codec='gzip' when the body is compressed,
+        so subscribers know to gzip.decompress it first
+    """
+    data = msgspec.json.encode(message_data)
+    if PUBSUB_COMPRESSION and len(data) > PUBSUB_COMPRESSION_MIN_BYTES:
+        return gzip.compress(data, compresslevel=6), {'codec': 'gzip'}
+    return data, {}
+
 
 def store_backup(
     project_name: str,
@@ -67,7 +91,7 @@ def store_backup(
 
         backup_url = f"gs://{BUCKET_NAME}/{blob_name}"
 
-        print(f"   ✅ Backup stored: {backup_url}")
+        logger.info("✅ Backup stored: %s", backup_url)
 
         return {
             'success': True,
@@ -75,7 +99,7 @@ def store_backup(
         }
 
     except Exception as e:
-        print(f"   ⚠️  Backup failed: {str(e)}")
+        logger.warning("⚠️  Backup failed: %s", e)
         return {
             'success': False,
             'error': str(e)
@@ -124,20 +148,19 @@ def log_generation(
         'build_logs': build_logs
     }
 
-    # Log to stdout (captured by Cloud Logging)
-    print(f"\n📊 Generation Metrics:")
-    print(json.dumps(log_entry, indent=2))
+    # Log to Cloud Logging (the entry is only formatted if the record is emitted)
+    logger.info("📊 Generation metrics: %s", log_entry)
 
     # Store in Supabase
     try:
         supabase = get_supabase_client()
         if supabase:
             supabase.table('darx_site_generations').insert(log_entry).execute()
-            print("   ✅ Logged to Supabase")
+            logger.info("✅ Logged to Supabase")
         else:
-            print("   ⚠️  Supabase not available, logged to Cloud Logging only")
+            logger.warning("⚠️  Supabase not available, logged to Cloud Logging only")
     except Exception as e:
-        print(f"   ⚠️  Failed to log to Supabase: {str(e)}")
+        logger.warning("⚠️  Failed to log to Supabase: %s", e)
 
 
 def list_backups(client_slug: str) -> Dict[str, Any]:
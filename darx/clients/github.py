@@ -4,6 +4,7 @@ GitHub operations for repository creation and code pushing
 
 import os
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from github import Github, GithubException, Auth, InputGitTreeElement
 from typing import Dict, List, Any
 
@@ -12,6 +13,9 @@ GITHUB_APP_ID = os.getenv('GITHUB_APP_ID')
 GITHUB_APP_PRIVATE_KEY = os.getenv('GITHUB_APP_PRIVATE_KEY')
 GITHUB_APP_INSTALLATION_ID = os.getenv('GITHUB_APP_INSTALLATION_ID')
 
+# Parallel blob uploads per push (one API round-trip per file)
+BLOB_UPLOAD_WORKERS = 8
+
 _github_client = None
 
 
@@ -179,26 +183,38 @@ def push_to_github(
         parent_commit = repo.get_git_commit(base_sha)
         base_tree = parent_commit.tree
 
-        # Create tree with all files
+        # Text files go inline in the tree request (GitHub writes their blobs), so the
+        # whole push is one tree call; only binary content needs separate blob uploads
         tree_elements = []
+        binary_files = []
         for file in files:
-            # Encode content to base64
-            content = file['content']
-            if isinstance(content, str):
-                content = content.encode('utf-8')
-
+            if isinstance(file['content'], str):
+                tree_elements.append(InputGitTreeElement(
+                    path=file['path'],
+                    mode='100644',  # Regular file
+                    type='blob',
+                    content=file['content']
+                ))
+            else:
+                binary_files.append(file)
+
+        # Upload binary blobs in parallel - each is an independent API call
+        def create_blob_element(file: Dict[str, Any]) -> InputGitTreeElement:
             blob = repo.create_git_blob(
-                base64.b64encode(content).decode('utf-8'),
+                base64.b64encode(file['content']).decode('utf-8'),
                 encoding='base64'
             )
 
-            element = InputGitTreeElement(
+            return InputGitTreeElement(
                 path=file['path'],
                 mode='100644',  # Regular file
                 type='blob',
                 sha=blob.sha
             )
-            tree_elements.append(element)
+
+        if binary_files:
+            with ThreadPoolExecutor(max_workers=BLOB_UPLOAD_WORKERS) as executor:
+                tree_elements.extend(executor.map(create_blob_element, binary_files))
 
         # Create tree
         tree = repo.create_git_tree(tree=tree_elements, base_tree=base_tree)
@@ -3,34 +3,261 @@ Anthropic Claude integration for code generation
 """
 
 import os
+import re
 import json
-from anthropic import Anthropic
-from typing import Dict, List, Any
+import time
+import logging
+import random
+import hashlib
+import msgspec
+import asyncio
+import threading
+import contextlib
+import weakref
+import itertools
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, TypedDict, TYPE_CHECKING
+
+# The Anthropic SDK is imported where clients are created, so importing this module
+# (e.g. for prompt or response helpers) doesn't load it
+if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 
+# Key format is checked once at import - it can't change for the life of the process
+API_KEY_FORMAT_OK = bool(ANTHROPIC_API_KEY and ANTHROPIC_API_KEY.startswith('sk-ant-'))
+if ANTHROPIC_API_KEY and not API_KEY_FORMAT_OK:
+    logger.warning("⚠️  API key doesn't start with 'sk-ant-' (expected format)")
+MODEL = 'claude-sonnet-4-5-20250929'  # Claude Sonnet 4.5 - excellent for structured output
+
+# Connection pool for the Anthropic client (HTTP/2, long-lived keepalive)
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=300)
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+# Concurrency guard for parallel generations (size to the Anthropic tier's RPM/TPM allowance)
+MAX_CONCURRENT_GENERATIONS = int(os.getenv('DARX_MAX_CONCURRENT', '4'))
+# Generation requests are retried here rather than by the SDK, so the sync and async paths
+# back off the same way (429s, 5xx/overloaded and dropped connections)
+GENERATION_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 2.0  # seconds
+RETRY_MAX_DELAY = 60.0  # seconds
+
+# Optional on-disk cache of successful generations, keyed on the exact request
+# (for dev/CI loops that regenerate the same site - unset in production)
+GENERATION_CACHE_DIR = os.getenv('DARX_CACHE_DIR')
+
+# Output token budget: floor fits the required boilerplate files, each industry
+# component set / feature adds its share, capped at the previous fixed limit
+MIN_OUTPUT_TOKENS = 8192
+MAX_OUTPUT_TOKENS = 16384
+INDUSTRY_OUTPUT_TOKENS = {
+    'real-estate': 4096,
+    'saas': 4096,
+    'ecommerce': 4096,
+    'healthcare': 4096,
+    'restaurant': 4096,
+}
+FEATURE_OUTPUT_TOKENS = {
+    'spline-3d': 1024,
+    'hubspot-form': 1024,
+    'stripe-checkout': 2048,
+}
+DEFAULT_FEATURE_OUTPUT_TOKENS = 1024
+# Continuations only ask for the few missing required files, so they get a small budget
+CONTINUATION_OUTPUT_TOKENS = 4096
+
+# Stop generating at a closing markdown fence or a runaway turn - anything after the JSON is wasted output
+STOP_SEQUENCES = ["\n```\n", "\n\nHuman:"]
+
+# User prompt - filled with str.format_map; client_info keys override the defaults
+USER_PROMPT_TEMPLATE = """Generate a complete Next.js 16 website with the following requirements:
+
+PROJECT: {project_name}
+INDUSTRY: {industry}
+CLIENT: {client_name}
+
+REQUIREMENTS:
+{requirements}
+
+FEATURES TO INCLUDE:
+{features}
+
+CLIENT CONTEXT:
+- Company: {client_name}
+- Industry: {client_industry}
+- Goal: {website_goal}
+
+Generate complete, production-ready code. Include Builder.io integration for visual editing."""
+
+USER_PROMPT_DEFAULTS = {
+    'client_name': 'N/A',
+    'website_goal': 'Lead generation and brand presence',
+}
+
+# Markdown code fence (```json or bare ```) - captures up to the closing fence, or the rest of the text if unclosed.
+# Surrounding whitespace is left outside the group so the match needs no .strip() copy.
+MARKDOWN_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|\Z)', re.DOTALL)
+
+# Response that starts with a JSON object (optionally after whitespace) - matched in place, no lstrip() copy
+LEADING_BRACE_RE = re.compile(r'\s*\{')
+
+# Start of the files array, and the whitespace/commas between its items - used to salvage truncated output
+FILES_ARRAY_RE = re.compile(r'"files"\s*:\s*\[')
+ARRAY_SEPARATOR_RE = re.compile(r'[\s,]*')
+_json_decoder = json.JSONDecoder()
+
+# Files every generation must include for the site to build and render
+REQUIRED_FILES = frozenset({
+    'app/[[...page]]/page.tsx',
+    'app/globals.css',
+    'app/layout.tsx',
+    'app/not-found.tsx',
+    'lib/builder.ts',
+    'package.json',
+    'tsconfig.json',
+    'vercel.json',
+})
+
+
+class GeneratedFile(TypedDict):
+    """A single generated file - content must be a string, even for JSON files"""
+    path: str
+    content: str
+
+
+class GeneratedSite(TypedDict):
+    """Expected shape of Claude's generation response"""
+    files: List[GeneratedFile]
+
+
 _client = None
+_http_client = None
+_client_lock = threading.Lock()
+
+# Process-wide cap on generations in flight - shared by the sync path, every event loop
+# and every thread, so DARX_MAX_CONCURRENT holds however generations are started
+_generation_slots = threading.BoundedSemaphore(MAX_CONCURRENT_GENERATIONS)
+
+# Async callers wait for a slot on this pool rather than the loop's default executor -
+# slot holders need the default executor themselves (getaddrinfo on connect), so
+# blocking it with waiters could deadlock a large batch
+_slot_waiters = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_GENERATIONS,
+    thread_name_prefix='generation-slot'
+)
+
+# The async client, semaphore, 429 state and lock are bound to the event loop they're used on,
+# so each loop (e.g. one asyncio.run() per batch) gets its own set
+_loop_resources = weakref.WeakKeyDictionary()
+
+
+def _check_api_key():
+    """Ensure the API key is configured (format is checked at import)"""
+    if not ANTHROPIC_API_KEY:
+        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+
 
 def get_client():
     """Get or create Anthropic client"""
-    global _client
-    if _client is None:
-        if not ANTHROPIC_API_KEY:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+    global _client, _http_client
+    if _client is not None:
+        return _client
 
-        # Debug: Check API key format (without logging the actual key)
-        key_prefix = ANTHROPIC_API_KEY[:10] if ANTHROPIC_API_KEY else "None"
-        key_length = len(ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else 0
-        print(f"   API Key Status: prefix={key_prefix}..., length={key_length}")
+    # Double-checked so concurrent request threads share a single connection pool
+    with _client_lock:
+        if _client is None:
+            _check_api_key()
 
-        if not ANTHROPIC_API_KEY.startswith('sk-ant-'):
-            print(f"   ⚠️  WARNING: API key doesn't start with 'sk-ant-' (expected format)")
+            from anthropic import Anthropic, DefaultHttpxClient
 
-        _client = Anthropic(api_key=ANTHROPIC_API_KEY)
+            http_client = DefaultHttpxClient(
+                http2=True,
+                limits=HTTP_LIMITS,
+                timeout=HTTP_TIMEOUT
+            )
+            _http_client = http_client
+            _client = Anthropic(api_key=ANTHROPIC_API_KEY, http_client=http_client)
     return _client
 
 
+def _get_loop_resources() -> Dict[str, Any]:
+    """Get the async client and concurrency primitives for the running event loop"""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = _loop_resources[loop] = {
+            'client': None,
+            'semaphore': asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS),
+            'rate_limited': False,
+            'rate_limit_lock': asyncio.Lock(),
+        }
+    return resources
+
+
+@contextlib.asynccontextmanager
+async def _generation_slot():
+    """
+    Hold one of the process-wide generation slots without blocking the event loop
+
+    The loop's own semaphore is taken first, so a loop never has more than
+    DARX_MAX_CONCURRENT waiters on the slot pool.
+    """
+    async with _get_loop_resources()['semaphore']:
+        loop = asyncio.get_running_loop()
+        acquire = loop.run_in_executor(_slot_waiters, _generation_slots.acquire)
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The waiting thread may still get the slot after we're cancelled - hand it back then
+            acquire.add_done_callback(lambda f: f.cancelled() or _generation_slots.release())
+            raise
+        try:
+            yield
+        finally:
+            _generation_slots.release()
+
+
+def get_async_client():
+    """Get or create async Anthropic client for the running event loop (retries are handled by generate_site_code_async)"""
+    resources = _get_loop_resources()
+    if resources['client'] is None:
+        _check_api_key()
+
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        http_client = DefaultAsyncHttpxClient(
+            http2=True,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT
+        )
+        resources['client'] = AsyncAnthropic(
+            api_key=ANTHROPIC_API_KEY,
+            http_client=http_client,
+            max_retries=0
+        )
+    return resources['client']
+
+
+def warm_client() -> None:
+    """
+    Create the shared client and open its TLS connection ahead of the first generation
+
+    Meant to run on a background thread at process start - the HEAD happens outside
+    _client_lock, so request threads that need the client never wait on it.
+    """
+    try:
+        client = get_client()
+        _http_client.head(str(client.base_url), timeout=5.0)
+    except (ValueError, httpx.HTTPError) as e:
+        # Warm-up is best effort - the first real request will connect anyway
+        logger.warning("⚠️  Anthropic connection warm-up failed: %s", e)
+
+
 def generate_site_code(
     project_name: str,
     requirements: str,
@@ -41,6 +268,10 @@ def generate_site_code(
     """
     Generate complete Next.js site code using Claude 3 Haiku.
 
+    At most DARX_MAX_CONCURRENT generations are in flight at once across the process.
+    Transient failures (429s, 5xx/overloaded, dropped connections) are retried with
+    exponential backoff and full jitter.
+
     Args:
         project_name: Project name (e.g., 'acme-corp')
         requirements: Website requirements and description
@@ -57,404 +288,421 @@ def generate_site_code(
         }
     """
 
-    features = features or []
-    client_info = client_info or {}
+    message_params = _build_message_params(project_name, requirements, industry, features, client_info)
 
-    # Build system prompt
-    system_prompt = _build_system_prompt(industry, features)
+    cached = _load_cached_result(message_params)
+    if cached is not None:
+        return cached
 
-    # Build user prompt
-    user_prompt = f"""Generate a complete Next.js 16 website with the following requirements:
+    try:
+        logger.debug("Calling Claude Sonnet 4.5 for %s...", project_name)
 
-PROJECT: {project_name}
-INDUSTRY: {industry}
-CLIENT: {client_info.get('client_name', 'N/A')}
+        client = get_client().with_options(max_retries=0)
+        with _generation_slots:
+            response = _stream_message_with_backoff(client, message_params)
+            files, continuation_params = _handle_response(message_params, response)
+            if continuation_params:
+                continuation = _stream_message_with_backoff(client, continuation_params)
+                files = _handle_continuation(files, continuation)
 
-REQUIREMENTS:
-{requirements}
+        return _finish_generation(message_params, files)
 
-FEATURES TO INCLUDE:
-{', '.join(features) if features else 'Standard features only'}
+    except Exception as e:
+        return _generation_failed(project_name, e)
 
-CLIENT CONTEXT:
-- Company: {client_info.get('client_name', 'N/A')}
-- Industry: {client_info.get('industry', industry)}
-- Goal: {client_info.get('website_goal', 'Lead generation and brand presence')}
 
-Generate complete, production-ready code. Include Builder.io integration for visual editing."""
+async def generate_site_code_async(
+    project_name: str,
+    requirements: str,
+    industry: str = 'general',
+    features: List[str] = None,
+    client_info: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """
+    Async variant of generate_site_code for generating several sites in parallel.
+
+    At most DARX_MAX_CONCURRENT generations are in flight at once across the process
+    (sync and async callers share the limit). Failed requests are retried as in
+    generate_site_code; after a rate-limit (429) error, calls on the same event loop
+    are serialized until a retry succeeds so the burst doesn't turn into a retry storm.
+
+    Returns:
+        Same shape as generate_site_code
+    """
+
+    message_params = _build_message_params(project_name, requirements, industry, features, client_info)
+
+    cached = _load_cached_result(message_params)
+    if cached is not None:
+        return cached
 
     try:
-        print("   Calling Claude Sonnet 4.5 (excellent for structured output)...")
+        logger.debug("Calling Claude Sonnet 4.5 for %s (async)...", project_name)
 
-        client = get_client()
-        response = client.messages.create(
-            model="claude-sonnet-4-5-20250929",  # Claude Sonnet 4.5 - excellent for structured output
-            max_tokens=16384,  # Increased from 8192 to prevent truncated generations
-            temperature=0.1,  # Lower temperature for consistent JSON formatting
-            system=system_prompt,
-            messages=[{
-                "role": "user",
-                "content": user_prompt
-            }]
-        )
+        client = get_async_client()
+        async with _generation_slot():
+            response = await _create_message_with_backoff(client, message_params)
+            files, continuation_params = _handle_response(message_params, response)
+            if continuation_params:
+                continuation = await _create_message_with_backoff(client, continuation_params)
+                files = _handle_continuation(files, continuation)
 
-        # Extract response
-        response_text = response.content[0].text
+        return _finish_generation(message_params, files)
 
-        print("   Parsing generated code...")
+    except Exception as e:
+        return _generation_failed(project_name, e)
 
-        # Parse JSON response
-        files_data = _parse_response(response_text)
 
-        if not files_data or 'files' not in files_data:
-            raise Exception("No files generated in response")
+async def generate_sites_batch(
+    items: List[Dict[str, Any]],
+    max_concurrency: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate several sites concurrently.
 
-        files = files_data['files']
-        components = _extract_components(files)
+    From synchronous code, run it with asyncio.run(generate_sites_batch(items)).
 
-        print(f"   ✅ Generated {len(files)} files, {len(components)} components")
+    Args:
+        items: generate_site_code keyword arguments, one dict per site
+        max_concurrency: Optional cap for this batch (the process-wide DARX_MAX_CONCURRENT limit always applies)
 
-        # CRITICAL: Validate that all required files were generated
-        file_paths = [f.get('path', '') for f in files]
-        required_files = ['app/[[...page]]/page.tsx', 'app/layout.tsx', 'app/not-found.tsx', 'lib/builder.ts', 'package.json', 'tsconfig.json', 'vercel.json']
-        missing_files = [f for f in required_files if f not in file_paths]
+    Returns:
+        generate_site_code results, in the same order as items
+    """
 
-        if missing_files:
-            raise Exception(
-                f"Generation incomplete! Missing critical files: {', '.join(missing_files)}. "
-                f"Generated files: {', '.join(file_paths)}. "
-                f"This usually means the response hit the token limit. Try simplifying the requirements."
-            )
+    batch_sem = asyncio.Semaphore(max_concurrency) if max_concurrency else None
 
-        return {
-            'success': True,
-            'files': files,
-            'components': components
-        }
+    async def _generate_one(item: Dict[str, Any]) -> Dict[str, Any]:
+        if batch_sem is None:
+            return await generate_site_code_async(**item)
+        async with batch_sem:
+            return await generate_site_code_async(**item)
 
-    except Exception as e:
-        print(f"   ❌ Generation failed: {str(e)}")
-        return {
-            'success': False,
-            'error': str(e)
-        }
+    return await asyncio.gather(*(_generate_one(item) for item in items))
 
 
-def _build_system_prompt(industry: str, features: List[str]) -> str:
-    """Build system prompt based on industry and features"""
+def _stream_message(client: 'Anthropic', message_params: Dict[str, Any]):
+    """
+    Run a generation as a streamed request and return the final message.
 
-    base_prompt = """You are DARX, an AI that generates production-ready Next.js 16 websites with Builder.io integration.
+    Streaming keeps the connection active while a long generation is produced,
+    instead of holding one idle request open until all output tokens are ready.
+    """
+    with client.messages.stream(**message_params) as stream:
+        return stream.get_final_message()
 
-CRITICAL SECURITY REQUIREMENT - EXACT DEPENDENCY VERSIONS:
-You MUST use these EXACT versions for security (CVE-2025-66478, CVE-2025-55182, CVE-2025-55184, CVE-2025-55183 patches):
-- next: "16.0.10" (REQUIRED - patched for CVE-2025-66478, CVE-2025-55184, CVE-2025-55183)
-- react: "18.3.1" (REQUIRED - compatible with lucide-react)
-- react-dom: "18.3.1" (REQUIRED)
 
-CRITICAL REQUIREMENTS:
-1. Generate COMPLETE, working code (no placeholders, no "// TODO", no "...rest of component")
-2. Use Next.js 16 App Router (app/ directory, not pages/)
-3. Use TypeScript for all files
-4. Use Tailwind CSS for styling
-5. Use Framer Motion for animations
-6. Integrate Builder.io SDK for visual editing
-7. Make it responsive (mobile-first)
-8. Include proper SEO meta tags
-9. Use modern React patterns (hooks, functional components)
+async def _stream_message_async(client: 'AsyncAnthropic', message_params: Dict[str, Any]):
+    """Async variant of _stream_message"""
+    async with client.messages.stream(**message_params) as stream:
+        return await stream.get_final_message()
 
-BUILDER.IO INTEGRATION:
-- Install @builder.io/react in package.json
-- Create lib/builder.ts with configuration
-- Register all custom components with Builder.registerComponent()
-- Wrap app in BuilderComponent for visual editing
-- Include builder.io API key in environment variables
 
-BUILDER.IO SDK INITIALIZATION - CRITICAL:
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Backoff (exponential, full jitter) before retrying a failed request, or None if it shouldn't be retried"""
+    from anthropic import APIConnectionError, InternalServerError, RateLimitError
 
-DO NOT call builder.init() or Builder.init() - it's not needed and causes errors!
-The Builder.io SDK is automatically initialized when BuilderComponent is used.
+    if attempt == GENERATION_MAX_RETRIES or not isinstance(error, (RateLimitError, InternalServerError, APIConnectionError)):
+        return None
 
-CORRECT Pattern (no initialization needed):
-```typescript
-import { Builder } from '@builder.io/react';
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    logger.warning(
+        "⚠️  Anthropic request failed (%s), retrying in %.1fs (attempt %d/%d)",
+        type(error).__name__, delay, attempt + 1, GENERATION_MAX_RETRIES
+    )
+    return delay
 
-// Builder.io is initialized automatically when BuilderComponent is used
-// This file ensures the Builder SDK is loaded and available
-// Component registration can be added here in the future
 
-export { Builder };
-```
-
-CRITICAL: Just import and export Builder - NO init() call needed!
-
-OUTPUT FORMAT - CRITICAL:
-You MUST respond with ONLY valid JSON. No markdown, no code blocks, no explanation text - just pure JSON.
-
-STRICT JSON RULES:
-- Use double quotes " for all strings (never single quotes ')
-- NO trailing commas after the last item in arrays or objects
-- Escape special characters: newlines as \\n, quotes as \\", backslashes as \\\\
-- Every opening brace { must have a closing brace }
-- Every opening bracket [ must have a closing bracket ]
-- The "content" field MUST ALWAYS BE A STRING, even for JSON files like package.json
-- For package.json, the content must be an ESCAPED JSON STRING, not a nested object
-
-CORRECT Examples:
-{
-  "files": [
-    {
-      "path": "package.json",
-      "content": "{\\n  \\"name\\": \\"my-app\\",\\n  \\"version\\": \\"0.1.0\\",\\n  \\"dependencies\\": {\\n    \\"next\\": \\"^14.0.0\\"\\n  }\\n}"
-    },
-    {
-      "path": "app/page.tsx",
-      "content": "import Hero from '@/components/Hero';\\n\\nexport default function Home() {\\n  return <div className=\\"min-h-screen\\"><Hero /></div>;\\n}"
-    },
-    {
-      "path": "components/Hero.tsx",
-      "content": "export default function Hero() {\\n  return <section>\\n    <h1>Welcome</h1>\\n  </section>;\\n}"
-    }
-  ]
-}
+def _stream_message_with_backoff(client: 'Anthropic', message_params: Dict[str, Any]):
+    """Stream a generation, retrying transient failures"""
+    for attempt in itertools.count():
+        try:
+            return _stream_message(client, message_params)
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
 
-WRONG - DO NOT DO THIS:
-{
-  "files": [
-    {
-      "path": "package.json",
-      "content": {
-        "name": "my-app"
-      }
+
+async def _create_message_with_backoff(client: 'AsyncAnthropic', message_params: Dict[str, Any]):
+    """Async variant of _stream_message_with_backoff that also narrows this loop's concurrency to 1 after a 429"""
+    from anthropic import RateLimitError
+
+    resources = _get_loop_resources()
+
+    for attempt in itertools.count():
+        try:
+            if resources['rate_limited']:
+                async with resources['rate_limit_lock']:
+                    response = await _stream_message_async(client, message_params)
+                resources['rate_limited'] = False
+            else:
+                response = await _stream_message_async(client, message_params)
+            return response
+
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                raise
+            if isinstance(e, RateLimitError):
+                resources['rate_limited'] = True
+            await asyncio.sleep(delay)
+
+
+def _cache_path(message_params: Dict[str, Any]) -> str:
+    """Cache file for a request - any change to the prompts, model or budget is a different key"""
+    key = hashlib.blake2b(msgspec.json.encode(message_params), digest_size=16).hexdigest()
+    return os.path.join(GENERATION_CACHE_DIR, f"{key}.json")
+
+
+def _load_cached_result(message_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a previously cached generation result, or None if caching is off or it's a miss"""
+    if not GENERATION_CACHE_DIR:
+        return None
+
+    path = _cache_path(message_params)
+    try:
+        with open(path, 'rb') as f:
+            result = msgspec.json.decode(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, msgspec.DecodeError) as e:
+        logger.warning("⚠️  Ignoring unreadable generation cache entry %s: %s", path, e)
+        return None
+
+    logger.info("Using cached generation (%d files)", len(result['files']))
+    return result
+
+
+def _store_cached_result(message_params: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Cache a successful generation result (best effort)"""
+    if not GENERATION_CACHE_DIR:
+        return
+
+    path = _cache_path(message_params)
+    try:
+        os.makedirs(GENERATION_CACHE_DIR, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(msgspec.json.encode(result))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("⚠️  Could not write generation cache entry %s: %s", path, e)
+
+
+def _build_message_params(
+    project_name: str,
+    requirements: str,
+    industry: str,
+    features: List[str],
+    client_info: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Build the messages.create parameters for a site generation"""
+
+    features = features or []
+    client_info = client_info or {}
+
+    # Build system prompt
+    system_prompt = get_prompt(industry, features)
+
+    # Build user prompt
+    user_prompt = USER_PROMPT_TEMPLATE.format_map({
+        **USER_PROMPT_DEFAULTS,
+        **client_info,
+        'project_name': project_name,
+        'industry': industry,
+        'client_industry': client_info.get('industry', industry),
+        'requirements': requirements,
+        'features': ', '.join(features) if features else 'Standard features only',
+    })
+
+    return {
+        'model': MODEL,
+        'max_tokens': _estimate_max_tokens(industry, features),
+        'temperature': 0.1,  # Lower temperature for consistent JSON formatting
+        'stop_sequences': STOP_SEQUENCES,
+        'system': system_prompt,
+        'messages': [{
+            "role": "user",
+            "content": user_prompt
+        }]
     }
-  ]
-}
 
-REQUIRED FILES (Generate these 12 essential files):
-1. package.json - Dependencies (Next.js 16, React 19, TypeScript, Tailwind, Framer Motion, Builder.io)
-2. tsconfig.json - TypeScript configuration with path aliases (CRITICAL for @/ imports)
-3. postcss.config.js - PostCSS configuration (CRITICAL for Tailwind CSS compilation)
-4. vercel.json - Vercel deployment configuration (Node.js version, build settings)
-5. app/layout.tsx - Root layout with metadata
-6. app/[[...page]]/page.tsx - Builder.io catch-all route (handles ALL pages including homepage - NO static app/page.tsx!)
-7. app/not-found.tsx - 404 error page (REQUIRED by Next.js App Router)
-8. lib/builder.ts - Builder.io initialization and component registration (REQUIRED for Builder.io integration)
-9. app/globals.css - Tailwind directives
-10. tailwind.config.ts - Tailwind configuration
-11. next.config.js - Next.js configuration
-12. middleware.ts - Multi-tenant client slug extraction (REQUIRED for SHARED Builder.io spaces)
-
-CRITICAL:
-- DO NOT generate app/page.tsx - use app/[[...page]]/page.tsx ONLY so Builder.io handles ALL routes
-- The catch-all route at app/[[...page]]/page.tsx must handle the homepage (/) and all other pages
-- This ensures Builder.io content is rendered for every page, not static templates
-
-NOT-FOUND PAGE TEMPLATE:
-app/not-found.tsx must be a simple 404 page:
-```typescript
-export default function NotFound() {
-  return (
-    <div className="min-h-screen flex items-center justify-center bg-gradient-to-br from-gray-50 to-gray-100">
-      <div className="text-center">
-        <h1 className="text-6xl font-bold text-gray-900 mb-4">404</h1>
-        <p className="text-xl text-gray-600 mb-8">Page not found</p>
-        <a href="/" className="text-blue-600 hover:text-blue-700">Return home</a>
-      </div>
-    </div>
-  );
-}
-```
 
-MIDDLEWARE TEMPLATE - middleware.ts:
-This file extracts the client slug from the hostname for multi-tenant Builder.io content isolation.
-CRITICAL: This is REQUIRED for SHARED Builder.io spaces to work correctly!
-```typescript
-import { NextRequest, NextResponse } from 'next/server';
+def _estimate_max_tokens(industry: str, features: List[str]) -> int:
+    """Estimate the output token budget from the industry and requested features"""
 
-export function middleware(request: NextRequest) {
-  const host = request.headers.get('host') || '';
+    estimate = MIN_OUTPUT_TOKENS + INDUSTRY_OUTPUT_TOKENS.get(industry, 0)
+    for feature in features:
+        estimate += FEATURE_OUTPUT_TOKENS.get(feature, DEFAULT_FEATURE_OUTPUT_TOKENS)
 
-  // Extract client_slug from hostname
-  // Format: {client-slug}.darx.site
-  const clientSlug = extractClientSlug(host);
+    return min(estimate, MAX_OUTPUT_TOKENS)
 
-  if (!clientSlug) {
-    return new NextResponse('Invalid hostname', { status: 400 });
-  }
 
-  // Inject client_slug into request headers for downstream use
-  const requestHeaders = new Headers(request.headers);
-  requestHeaders.set('x-client-slug', clientSlug);
+def _parse_files(response_text: str, truncated: bool = False) -> List[GeneratedFile]:
+    """
+    Parse the generated files out of Claude's response.
 
-  return NextResponse.next({
-    request: {
-      headers: requestHeaders,
-    },
-  });
-}
+    If the response was truncated at max_tokens, whatever complete files can be
+    salvaged are returned (possibly none) so a continuation can fill in the rest.
+    """
 
-function extractClientSlug(host: string): string | null {
-  // acme.darx.site → acme
-  // acme-company.darx.site → acme-company
-  // localhost:3000 → development (for local dev)
-  // test-client-14.vercel.app → test-client-14
-  // test-client-14-hash123-team.vercel.app → test-client-14 (Vercel preview)
+    logger.debug("Parsing generated code...")
 
-  if (host.includes('localhost')) {
-    return process.env.NEXT_PUBLIC_CLIENT_SLUG || 'development';
-  }
+    try:
+        files_data = _parse_response(response_text)
+    except Exception as e:
+        if not truncated:
+            raise
+        logger.warning("⚠️  Could not salvage any files from truncated response: %s", e)
+        return []
 
-  const parts = host.split('.');
-  if (parts.length < 3) {
-    return null;
-  }
+    if not files_data or 'files' not in files_data:
+        raise Exception("No files generated in response")
 
-  let subdomain = parts[0];
+    return files_data['files']
 
-  // Handle Vercel preview URLs: project-hash-team.vercel.app
-  // Extract just the project name (everything before first hash-like segment)
-  if (host.includes('.vercel.app')) {
-    // Vercel preview URLs have format: {project}-{hash}-{team}.vercel.app
-    // Production URLs have format: {project}.vercel.app
-    // We need to extract just the {project} part
 
-    // Split subdomain by hyphens
-    const segments = subdomain.split('-');
+def _build_continuation_params(
+    message_params: Dict[str, Any],
+    partial_text: str,
+    files: List[GeneratedFile]
+) -> Dict[str, Any]:
+    """
+    Build a follow-up request for the required files missing from a truncated response.
 
-    // If more than 3 segments, it's likely a preview URL with hash
-    // Example: test-client-14-kszvvxbwu-digitalarchitexs-projects
-    // We want: test-client-14
-    if (segments.length > 3) {
-      // Find where the hash-like segment starts (8+ char alphanumeric string)
-      const hashIndex = segments.findIndex(seg =>
-        seg.length >= 8 && /^[a-z0-9]+$/.test(seg)
-      );
+    Returns:
+        messages.create parameters, or None if nothing required is missing
+    """
 
-      if (hashIndex > 0) {
-        // Take everything before the hash
-        subdomain = segments.slice(0, hashIndex).join('-');
-      }
+    missing_files = GENERATED_REQUIRED_FILES.difference(f['path'] for f in files)
+    if not missing_files:
+        return None
+
+    logger.warning(
+        "⚠️  Response hit max_tokens, requesting %d missing files: %s",
+        len(missing_files), ', '.join(sorted(missing_files))
+    )
+
+    return {
+        **message_params,
+        'max_tokens': CONTINUATION_OUTPUT_TOKENS,
+        'messages': message_params['messages'] + [
+            {
+                "role": "assistant",
+                "content": partial_text.rstrip() or "{"
+            },
+            {
+                "role": "user",
+                "content": (
+                    "Your previous response was cut off at the output limit. "
+                    "Respond with a new JSON object in the same format containing ONLY these files: "
+                    f"{', '.join(sorted(missing_files))}. Keep them as small as possible."
+                )
+            }
+        ]
     }
-  }
 
-  // Validate slug format
-  if (!/^[a-z0-9-]+$/.test(subdomain)) {
-    return null;
-  }
 
-  return subdomain;
-}
+def _handle_response(
+    message_params: Dict[str, Any],
+    response: Any
+) -> Tuple[List[GeneratedFile], Optional[Dict[str, Any]]]:
+    """
+    Parse the files out of a generation response.
 
-export const config = {
-  matcher: '/:path*',
-};
-```
-
-CRITICAL: The middleware.ts file is REQUIRED for multi-tenant setups:
-1. It extracts the client slug from the hostname (subdomain)
-2. Handles both production URLs (client.darx.site) and Vercel preview URLs
-3. Vercel preview URL format: project-hash-team.vercel.app → extracts "project"
-4. Injects x-client-slug header for use in API routes and page components
-5. Returns 400 error for invalid hostnames (security)
-
-This middleware enables:
-- Multi-tenant content isolation in SHARED Builder.io spaces
-- Correct client slug extraction from various URL formats
-- Security validation of hostname format
-
-TYPESCRIPT CONFIGURATION TEMPLATE - tsconfig.json:
-This file configures TypeScript and enables the @/ path alias. This is CRITICAL for imports to work.
-```json
-{
-  "compilerOptions": {
-    "target": "ES2017",
-    "lib": ["dom", "dom.iterable", "esnext"],
-    "allowJs": true,
-    "skipLibCheck": true,
-    "strict": true,
-    "noEmit": true,
-    "esModuleInterop": true,
-    "module": "esnext",
-    "moduleResolution": "bundler",
-    "resolveJsonModule": true,
-    "isolatedModules": true,
-    "jsx": "preserve",
-    "incremental": true,
-    "plugins": [
-      {
-        "name": "next"
-      }
-    ],
-    "paths": {
-      "@/*": ["./*"]
+    Returns:
+        (files, continuation_params) - continuation_params is None unless the output hit
+        the token limit before every required file, in which case it asks for just the missing ones
+    """
+
+    response_text = response.content[0].text
+    truncated = response.stop_reason == 'max_tokens'
+
+    files = _parse_files(response_text, truncated=truncated)
+    continuation_params = _build_continuation_params(message_params, response_text, files) if truncated else None
+    return files, continuation_params
+
+
+def _handle_continuation(files: List[GeneratedFile], continuation: Any) -> List[GeneratedFile]:
+    """Merge the files from a continuation response into the first response's files"""
+
+    return _merge_files(files, _parse_files(continuation.content[0].text))
+
+
+def _finish_generation(message_params: Dict[str, Any], files: List[GeneratedFile]) -> Dict[str, Any]:
+    """Build the generate_site_code result and cache it"""
+
+    result = _build_result(files)
+    _store_cached_result(message_params, result)
+    return result
+
+
+def _generation_failed(project_name: str, error: Exception) -> Dict[str, Any]:
+    """Log a failed generation and build its generate_site_code result"""
+
+    logger.error("❌ Generation failed for %s: %s", project_name, error)
+    return {
+        'success': False,
+        'error': str(error)
     }
-  },
-  "include": ["next-env.d.ts", "**/*.ts", "**/*.tsx", ".next/types/**/*.ts"],
-  "exclude": ["node_modules"]
-}
-```
 
-CRITICAL: tsconfig.json MUST include the "paths" configuration with "@/*": ["./*"] to enable @/ imports!
 
-POSTCSS CONFIGURATION TEMPLATE - postcss.config.js:
-This file configures PostCSS to process Tailwind CSS. This is CRITICAL for Tailwind utility classes to work.
-```javascript
-module.exports = {
-  plugins: {
-    tailwindcss: {},
-    autoprefixer: {},
-  },
-}
-```
+def _merge_files(files: List[GeneratedFile], extra_files: List[GeneratedFile]) -> List[GeneratedFile]:
+    """Append files from a continuation response, keeping the first version of any duplicate path"""
 
-CRITICAL: postcss.config.js MUST be included or Tailwind CSS will not compile! Without this file, the @tailwind directives in globals.css will remain as raw text and no Tailwind styles will be applied.
+    seen_paths = {f['path'] for f in files}
+    return files + [f for f in extra_files if f['path'] not in seen_paths]
 
-BUILDER.IO INTEGRATION FILE TEMPLATE - lib/builder.ts:
-This file initializes Builder.io. Keep it SIMPLE - just import and export.
-```typescript
-'use client';
 
-import { Builder } from '@builder.io/react';
+def _add_static_files(files: List[GeneratedFile]) -> List[GeneratedFile]:
+    """Add the static template files, replacing any generated copy of the same path"""
 
-// Builder.io is initialized automatically when BuilderComponent is used
-// This file ensures the Builder SDK is loaded and available
-// Component registration can be added here in the future
+    return [f for f in files if f['path'] not in STATIC_FILES] + [
+        {'path': path, 'content': content}
+        for path, content in STATIC_FILES.items()
+    ]
+
+
+def _build_result(files: List[GeneratedFile]) -> Dict[str, Any]:
+    """Add static files and validate the generated files into the generate_site_code result"""
+
+    files = _add_static_files(files)
+
+    # Collect paths and component names in one pass (e.g., components/Hero.tsx -> Hero)
+    file_paths = set()
+    components = []
+    for file in files:
+        path = file['path']
+        file_paths.add(path)
+        if path.startswith('components/') and path.endswith('.tsx'):
+            components.append(path[path.rfind('/') + 1:-4])
+
+    logger.info("✅ Generated %d files, %d components", len(files), len(components))
+
+    # CRITICAL: Validate that all required files were generated
+    missing_files = REQUIRED_FILES - file_paths
+
+    if missing_files:
+        raise Exception(
+            f"Generation incomplete! Missing critical files: {', '.join(sorted(missing_files))}. "
+            f"Generated files: {', '.join(f['path'] for f in files)}. "
+            f"This usually means the response hit the token limit. Try simplifying the requirements."
+        )
+
+    return {
+        'success': True,
+        'files': files,
+        'components': components
+    }
 
-export { Builder };
-```
-
-CRITICAL: lib/builder.ts MUST be simple:
-1. Add 'use client' directive at the top
-2. Import Builder from '@builder.io/react'
-3. Export Builder
-4. DO NOT try to register components yet - keep it minimal for now
-5. Future enhancement: component registration can be added later
-
-ENVIRONMENT VARIABLES:
-Make sure to document that NEXT_PUBLIC_BUILDER_API_KEY must be set in .env.local or Vercel environment variables.
-
-CRITICAL: IMPORT lib/builder.ts IN app/layout.tsx
-To ensure Builder.io SDK is loaded, add this import to app/layout.tsx:
-```typescript
-// Import Builder.io SDK initialization
-import '@/lib/builder';
-```
-This import should be at the TOP of app/layout.tsx, after other imports but before the component definition.
-Example:
-```typescript
-import type { Metadata } from 'next';
-import { Inter } from 'next/font/google';
-import './globals.css';
-import '@/lib/builder'; // <-- Add this line
-
-const inter = Inter({ subsets: ['latin'] });
-```
-
-BUILDER.IO CATCH-ALL ROUTE - CRITICAL FOR VISUAL EDITOR:
-You MUST create app/[[...page]]/page.tsx to enable Builder.io visual editor preview.
-This route fetches and renders all Builder.io pages, with support for both DEDICATED and SHARED modes.
-
-```typescript
-'use client';
+
+# Builder.io catch-all route - identical for every site, so it's emitted locally instead of generated.
+# Handles ALL pages including "/" in both SHARED (client-page model, filtered by client slug)
+# and DEDICATED (page model, URL matching) Builder.io spaces.
+CATCH_ALL_PAGE_TSX = """'use client';
 
 import { BuilderComponent, builder, useIsPreviewing } from '@builder.io/react';
 import { useEffect, useState } from 'react';
@@ -568,339 +816,394 @@ export default function Page({ params }: PageProps) {
     />
   );
 }
-```
-
-CRITICAL: The catch-all route at app/[[...page]]/page.tsx is REQUIRED:
-1. It must use double square brackets [[...page]] to include the root path (/)
-2. It detects SHARED vs DEDICATED mode from NEXT_PUBLIC_BUILDER_SPACE_MODE env var
-3. For SHARED mode: queries using client_slug filter for multi-tenant isolation
-4. For DEDICATED mode: uses traditional URL matching
-5. It includes security validation to prevent cross-client content leakage
-6. It renders content using BuilderComponent with the appropriate model
-7. It shows a helpful message when no content exists (instead of blank page)
-
-This route enables:
-- Builder.io visual editor preview
-- Client can edit pages in Builder.io UI
-- Changes in Builder.io appear on the live site immediately
-- Support for both dedicated and shared Builder.io spaces
-
-PACKAGE.JSON REQUIREMENTS - CRITICAL SECURITY VERSIONS:
-You MUST use these EXACT versions (NOT ranges like ^14.0.0):
-{
-  "dependencies": {
-    "next": "16.0.10",
-    "react": "18.3.1",
-    "react-dom": "18.3.1",
-    "@builder.io/react": "^4.0.0",
-    "@builder.io/sdk": "^2.0.0",
-    "framer-motion": "^11.0.0",
-    "lucide-react": "^0.263.1",
-    "tailwindcss": "^3.4.0",
-    "typescript": "^5.3.0"
-  },
-  "devDependencies": {
-    "@types/node": "^20.0.0",
-    "@types/react": "^18.3.0",
-    "@types/react-dom": "^18.3.0",
-    "postcss": "^8.4.0",
-    "autoprefixer": "^10.4.0"
-  },
-  "engines": {"node": "22.x"}
-}
-# Updated: 2025-12-19 23:30 UTC - React 18.3.1 for lucide-react compatibility
+"""
 
+# Builder.io SDK loader - imported by app/layout.tsx. Builder.io initializes itself when
+# BuilderComponent is used, so no init() call here.
+BUILDER_LIB_TS = """'use client';
 
-CRITICAL: Do NOT use version ranges for next, react, or react-dom. Use EXACT versions as shown above.
-- DO NOT include: isolated-vm, vm2, node-gyp, or any packages with native C++ bindings
-- DO NOT add extra packages beyond what's explicitly requested
-- Keep devDependencies minimal: only TypeScript types and build tools
+import { Builder } from '@builder.io/react';
+
+// Builder.io is initialized automatically when BuilderComponent is used
+// This file ensures the Builder SDK is loaded and available
+// Component registration can be added here in the future
+
+export { Builder };
+"""
+
+# 404 page (required by the Next.js App Router) - kept as a server component
+NOT_FOUND_PAGE_TSX = """export default function NotFound() {
+  return (
+    <div className="min-h-screen flex items-center justify-center bg-gradient-to-br from-gray-50 to-gray-100">
+      <div className="text-center">
+        <h1 className="text-6xl font-bold text-gray-900 mb-4">404</h1>
+        <p className="text-xl text-gray-600 mb-8">Page not found</p>
+        <a href="/" className="text-blue-600 hover:text-blue-700">Return home</a>
+      </div>
+    </div>
+  );
+}
+"""
 
-VERCEL.JSON CONFIGURATION:
-Generate a vercel.json file with:
-{
+VERCEL_JSON = """{
   "buildCommand": "next build",
   "framework": "nextjs",
   "installCommand": "npm install"
 }
+"""
 
-This ensures compatibility and prevents build failures.
+# Multi-tenant client slug extraction - REQUIRED for SHARED Builder.io spaces. Handles
+# {slug}.darx.site, {project}.vercel.app and {project}-{hash}-{team}.vercel.app previews,
+# injects the x-client-slug header, and rejects invalid hostnames with a 400.
+MIDDLEWARE_TS = """import { NextRequest, NextResponse } from 'next/server';
 
-STYLING GUIDELINES:
-- Use Tailwind utility classes
-- Modern color schemes (gradients, professional palette)
-- Generous spacing (p-8, py-16, etc.)
-- Professional typography (text-4xl, text-lg, font-bold, etc.)
-- Smooth animations with Framer Motion
+export function middleware(request: NextRequest) {
+  const host = request.headers.get('host') || '';
 
-GLOBALS.CSS TEMPLATE (use this EXACT structure):
-```css
-@tailwind base;
-@tailwind components;
-@tailwind utilities;
+  // Extract client_slug from hostname
+  // Format: {client-slug}.darx.site
+  const clientSlug = extractClientSlug(host);
 
-@layer base {
-  body {
-    @apply bg-white text-gray-900;
+  if (!clientSlug) {
+    return new NextResponse('Invalid hostname', { status: 400 });
   }
+
+  // Inject client_slug into request headers for downstream use
+  const requestHeaders = new Headers(request.headers);
+  requestHeaders.set('x-client-slug', clientSlug);
+
+  return NextResponse.next({
+    request: {
+      headers: requestHeaders,
+    },
+  });
 }
-```
 
-CRITICAL:
-- DO NOT use @apply with CSS variables (e.g., border-border, bg-background)
-- Keep globals.css minimal - only Tailwind directives and basic body styles
-- Use Tailwind utility classes directly in components instead of @apply
+function extractClientSlug(host: string): string | null {
+  // acme.darx.site → acme
+  // acme-company.darx.site → acme-company
+  // localhost:3000 → development (for local dev)
+  // test-client-14.vercel.app → test-client-14
+  // test-client-14-hash123-team.vercel.app → test-client-14 (Vercel preview)
 
-CRITICAL: CLIENT vs SERVER COMPONENTS
-Next.js App Router uses Server Components by default. You MUST add 'use client' directive to files that use:
-- Framer Motion (motion.div, motion.section, etc.)
-- React hooks (useState, useEffect, useContext, etc.)
-- Event handlers (onClick, onChange, onSubmit, etc.)
-- Browser APIs (window, document, localStorage, etc.)
+  if (host.includes('localhost')) {
+    return process.env.NEXT_PUBLIC_CLIENT_SLUG || 'development';
+  }
 
-ALWAYS add 'use client' at the TOP of app/page.tsx if using Framer Motion:
-```typescript
-'use client';
+  const parts = host.split('.');
+  if (parts.length < 3) {
+    return null;
+  }
 
-import { motion } from 'framer-motion';
-import { useState } from 'react';
+  let subdomain = parts[0];
 
-export default function Page() {
-  // Your component code
-}
-```
+  // Handle Vercel preview URLs: project-hash-team.vercel.app
+  // Extract just the project name (everything before first hash-like segment)
+  if (host.includes('.vercel.app')) {
+    // Vercel preview URLs have format: {project}-{hash}-{team}.vercel.app
+    // Production URLs have format: {project}.vercel.app
+    // We need to extract just the {project} part
 
-Files that should NEVER have 'use client':
-- app/layout.tsx (unless using client features)
-- app/not-found.tsx (keep as server component)
+    // Split subdomain by hyphens
+    const segments = subdomain.split('-');
 
-BUILDER.IO COMPONENT REGISTRATION:
-Every custom component must be registered:
+    // If more than 3 segments, it's likely a preview URL with hash
+    // Example: test-client-14-kszvvxbwu-digitalarchitexs-projects
+    // We want: test-client-14
+    if (segments.length > 3) {
+      // Find where the hash-like segment starts (8+ char alphanumeric string)
+      const hashIndex = segments.findIndex(seg =>
+        seg.length >= 8 && /^[a-z0-9]+$/.test(seg)
+      );
 
-```typescript
-import { Builder } from '@builder.io/react';
+      if (hashIndex > 0) {
+        // Take everything before the hash
+        subdomain = segments.slice(0, hashIndex).join('-');
+      }
+    }
+  }
+
+  // Validate slug format
+  if (!/^[a-z0-9-]+$/.test(subdomain)) {
+    return null;
+  }
 
-Builder.registerComponent(ComponentName, {
-  name: 'Component Display Name',
-  inputs: [
-    {
-      name: 'propName',
-      type: 'string',
-      defaultValue: 'default value'
+  return subdomain;
+}
+
+export const config = {
+  matcher: '/:path*',
+};
+"""
+
+# TypeScript config - the "@/*" path alias is required for @/ imports
+TSCONFIG_JSON = """{
+  "compilerOptions": {
+    "target": "ES2017",
+    "lib": ["dom", "dom.iterable", "esnext"],
+    "allowJs": true,
+    "skipLibCheck": true,
+    "strict": true,
+    "noEmit": true,
+    "esModuleInterop": true,
+    "module": "esnext",
+    "moduleResolution": "bundler",
+    "resolveJsonModule": true,
+    "isolatedModules": true,
+    "jsx": "preserve",
+    "incremental": true,
+    "plugins": [
+      {
+        "name": "next"
+      }
+    ],
+    "paths": {
+      "@/*": ["./*"]
     }
-  ]
-});
-```
-
-FRAMER MOTION ANIMATION GUIDELINES - CRITICAL:
-Framer Motion has strict TypeScript types. Follow these patterns EXACTLY to avoid type errors:
-
-1. **Variants Objects** - DO NOT include 'transition' at top level:
-   ```typescript
-   import { Variants } from 'framer-motion';
-
-   // ✅ CORRECT - No transition in variants object
-   const fadeInUp: Variants = {
-     initial: { opacity: 0, y: 30 },
-     animate: { opacity: 1, y: 0 }
-     // NO transition property here
-   };
-
-   // ❌ WRONG - Will cause TypeScript error
-   const fadeInUp: Variants = {
-     initial: { opacity: 0, y: 30 },
-     animate: { opacity: 1, y: 0 },
-     transition: { duration: 0.6 }  // Type error!
-   };
-   ```
-
-2. **Motion Components** - Pass transition separately:
-   ```typescript
-   // ✅ CORRECT - Transition as separate prop
-   <motion.div
-     variants={fadeInUp}
-     initial="initial"
-     animate="animate"
-     transition={{ duration: 0.6, ease: "easeOut" }}
-   >
-     Content here
-   </motion.div>
-
-   // Alternative: No variants, inline values
-   <motion.div
-     initial={{ opacity: 0, y: 30 }}
-     animate={{ opacity: 1, y: 0 }}
-     transition={{ duration: 0.6 }}
-   >
-     Content here
-   </motion.div>
-   ```
-
-3. **Common Animation Variants** - Use these type-safe patterns:
-   ```typescript
-   const fadeIn: Variants = {
-     initial: { opacity: 0 },
-     animate: { opacity: 1 }
-   };
-
-   const slideUp: Variants = {
-     initial: { y: 20, opacity: 0 },
-     animate: { y: 0, opacity: 1 }
-   };
-
-   const scaleIn: Variants = {
-     initial: { scale: 0.8, opacity: 0 },
-     animate: { scale: 1, opacity: 1 }
-   };
-   ```
-
-REMEMBER: Never put transition, duration, delay, or any timing properties inside Variants objects. Always pass them as separate props to the motion component."""
-
-    # Add industry-specific instructions
-    industry_prompts = {
-        'real-estate': """
-INDUSTRY: REAL ESTATE
+  },
+  "include": ["next-env.d.ts", "**/*.ts", "**/*.tsx", ".next/types/**/*.ts"],
+  "exclude": ["node_modules"]
+}
+"""
+
+# Without this, the @tailwind directives in globals.css are never compiled
+POSTCSS_CONFIG_JS = """module.exports = {
+  plugins: {
+    tailwindcss: {},
+    autoprefixer: {},
+  },
+}
+"""
+
+# Invariant boilerplate added to every generation after parsing (path -> content) - anything
+# that carries the site's design (layout, styles, components) stays with the model
+STATIC_FILES = {
+    'app/[[...page]]/page.tsx': CATCH_ALL_PAGE_TSX,
+    'app/not-found.tsx': NOT_FOUND_PAGE_TSX,
+    'lib/builder.ts': BUILDER_LIB_TS,
+    'vercel.json': VERCEL_JSON,
+    'middleware.ts': MIDDLEWARE_TS,
+    'tsconfig.json': TSCONFIG_JSON,
+    'postcss.config.js': POSTCSS_CONFIG_JS,
+}
+
+# Required files that only Claude can produce - what a continuation has to ask for
+GENERATED_REQUIRED_FILES = REQUIRED_FILES - STATIC_FILES.keys()
+
+
+BASE_SYSTEM_PROMPT = """You are DARX, an AI that generates production-ready Next.js 16 websites with Builder.io integration.
+Write COMPLETE, working code - no placeholders, no "// TODO", no "...rest of component". Use the App Router, TypeScript, Tailwind CSS utility classes and Framer Motion; make it responsive (mobile-first) with SEO metadata, hooks and functional components, a professional palette, generous spacing (p-8, py-16) and strong typography.
+
+JSON_OUTPUT_FORMAT:
+Respond with ONLY a JSON object (no markdown, no prose) matching this JSON Schema:
+{"type": "object", "required": ["files"], "properties": {"files": {"type": "array", "items": {"type": "object", "required": ["path", "content"], "properties": {"path": {"type": "string"}, "content": {"type": "string"}}}}}}
+- Double quotes only; no trailing commas; escape newlines as \\n, quotes as \\", backslashes as \\\\
+- "content" is ALWAYS a string - package.json content is an escaped JSON string, never a nested object
+Example: {"files": [{"path": "package.json", "content": "{\\n  \\"name\\": \\"my-app\\"\\n}"}, {"path": "components/Hero.tsx", "content": "export default function Hero() {\\n  return <section><h1>Welcome</h1></section>;\\n}"}]}
+
+SECURITY_VERSIONS (package.json - next/react/react-dom pinned EXACTLY, no ranges; patched for CVE-2025-66478, CVE-2025-55182, CVE-2025-55184, CVE-2025-55183):
+{"dependencies": {"next": "16.0.10", "react": "18.3.1", "react-dom": "18.3.1", "@builder.io/react": "^4.0.0", "@builder.io/sdk": "^2.0.0", "framer-motion": "^11.0.0", "lucide-react": "^0.263.1", "tailwindcss": "^3.4.0", "typescript": "^5.3.0"}, "devDependencies": {"@types/node": "^20.0.0", "@types/react": "^18.3.0", "@types/react-dom": "^18.3.0", "postcss": "^8.4.0", "autoprefixer": "^10.4.0"}, "engines": {"node": "22.x"}}
+Add packages only when a requested feature needs them; never isolated-vm, vm2, node-gyp or anything with native C++ bindings.
+
+BUILDER_IO_RULES:
+- Register every custom component with Builder.registerComponent(Component, {name: '...', inputs: [{name, type, defaultValue}]})
+- Every page (including "/") is rendered by the provided catch-all route - model 'client-page' in SHARED mode, 'page' in DEDICATED mode
+- app/layout.tsx must import '@/lib/builder' after its other imports (Metadata, Inter font, './globals.css'); never call builder.init() or Builder.init()
+- Document that NEXT_PUBLIC_BUILDER_API_KEY must be set in .env.local or the Vercel project
+
+FRAMER_MOTION_RULES:
+- Variants objects contain ONLY states (e.g. initial/animate) - never transition, duration, delay or other timing keys; pass timing via the motion component's transition prop
+- Add 'use client' at the top of any file using Framer Motion, React hooks, event handlers or browser APIs; app/layout.tsx stays a server component
+
+FILE_MANIFEST:
+- Provided automatically - do NOT generate: app/[[...page]]/page.tsx, app/not-found.tsx, lib/builder.ts, middleware.ts, vercel.json, tsconfig.json (maps "@/*" to "./*"), postcss.config.js
+- NEVER generate app/page.tsx - it would shadow the catch-all route
+- Generate: package.json, app/layout.tsx, app/globals.css (@tailwind base/components/utilities first, then minimal base styles - never rely on @apply with CSS variables), tailwind.config.ts, next.config.js and every component under components/"""
+
+
+
+# Industry-specific component instructions, appended after the cached base prompt
+INDUSTRY_PROMPTS = {
+    'real-estate': """INDUSTRY: REAL ESTATE
 Include these components:
 - PropertySearch: Search form with filters (location, price, bedrooms)
 - PropertyCard: Display property with image, price, details
 - MortgageCalculator: Calculate monthly payments
 - ContactAgent: Lead capture form with HubSpot integration""",
 
-        'saas': """
-INDUSTRY: SAAS
+    'saas': """INDUSTRY: SAAS
 Include these components:
 - PricingTable: Pricing tiers with feature comparison
 - FeatureComparison: Detailed feature matrix
 - PricingCalculator: Dynamic pricing based on users/features
 - OnboardingFlow: Step-by-step signup process""",
 
-        'ecommerce': """
-INDUSTRY: E-COMMERCE
+    'ecommerce': """INDUSTRY: E-COMMERCE
 Include these components:
 - ProductGrid: Product catalog with filters
 - ProductCard: Individual product display
 - ShoppingCart: Cart management (use context)
 - CheckoutFlow: Multi-step checkout""",
 
-        'healthcare': """
-INDUSTRY: HEALTHCARE
+    'healthcare': """INDUSTRY: HEALTHCARE
 Include these components:
 - AppointmentBooking: Calendly integration
 - DoctorProfile: Provider information and credentials
 - InsuranceChecker: Coverage verification form
 - PatientPortal: Secure login area""",
 
-        'restaurant': """
-INDUSTRY: RESTAURANT
+    'restaurant': """INDUSTRY: RESTAURANT
 Include these components:
 - MenuDisplay: Interactive menu with categories
 - OnlineOrdering: Order management system
 - ReservationSystem: Table booking (OpenTable/Resy)
-- LocationMap: Google Maps integration"""
-    }
-
-    if industry in industry_prompts:
-        base_prompt += "\n\n" + industry_prompts[industry]
-
-    # Add feature-specific instructions
-    if 'spline-3d' in features:
-        base_prompt += """
+- LocationMap: Google Maps integration""",
+}
 
-SPLINE 3D INTEGRATION:
+# Feature-specific instructions, appended in this order when requested
+FEATURE_PROMPTS = {
+    'spline-3d': """SPLINE 3D INTEGRATION:
 - Install @splinetool/react-spline in package.json
 - Create SplineScene component with scene URL prop
 - Register with Builder.io for drag-and-drop
-- Add loading state and error handling"""
-
-    if 'hubspot-form' in features:
-        base_prompt += """
+- Add loading state and error handling""",
 
-HUBSPOT FORM INTEGRATION:
+    'hubspot-form': """HUBSPOT FORM INTEGRATION:
 - Create HubSpotForm component
 - Use HubSpot Forms API for submission
 - Include fields: email, firstname, lastname, company, phone
-- Register with Builder.io"""
-
-    if 'stripe-checkout' in features:
-        base_prompt += """
+- Register with Builder.io""",
 
-STRIPE INTEGRATION:
+    'stripe-checkout': """STRIPE INTEGRATION:
 - Install @stripe/stripe-js
 - Create StripeCheckout component
 - API route for creating checkout session
-- Register with Builder.io"""
+- Register with Builder.io""",
+}
+
+# Features that add instructions to the system prompt (others don't change it)
+PROMPT_FEATURES = frozenset(FEATURE_PROMPTS)
+
+
+def get_prompt(industry: str, features: List[str]) -> List[Dict[str, Any]]:
+    """
+    Get the system prompt for an industry/feature combination.
+
+    Every combination is built once at import (PROMPT_TABLE), so this is a dict
+    lookup. Industries and features that don't affect the prompt are ignored.
+
+    Returns:
+        System prompt blocks
+    """
+    return PROMPT_TABLE[(
+        industry if industry in INDUSTRY_PROMPTS else None,
+        PROMPT_FEATURES.intersection(features)
+    )]
+
+
+def _build_system_prompt(industry: str, features: List[str]) -> List[Dict[str, Any]]:
+    """
+    Build system prompt blocks based on industry and features.
+
+    The base prompt comes first, followed by one block with the industry/feature
+    instructions (if any).
+    """
 
-    base_prompt += "\n\nIMPORTANT: Generate COMPLETE code. Every component must be fully functional. No placeholders."
-    base_prompt += "\n\nREMINDER: Your response must be ONLY valid JSON with no markdown formatting or extra text. Start with { and end with }."
+    sections = []
+    if industry in INDUSTRY_PROMPTS:
+        sections.append(INDUSTRY_PROMPTS[industry])
+    sections.extend(prompt for feature, prompt in FEATURE_PROMPTS.items() if feature in features)
 
-    return base_prompt
+    blocks = [{"type": "text", "text": BASE_SYSTEM_PROMPT}]
+    if sections:
+        blocks.append({"type": "text", "text": "\n\n".join(sections)})
 
+    return blocks
 
-def _parse_response(response_text: str) -> Dict[str, Any]:
-    """Parse JSON from Claude's response"""
+
+# (industry, prompt features) -> system prompt blocks for every known industry (None = generic)
+# and every subset of the prompt features - 6 x 8 entries, built once at import
+PROMPT_TABLE = {
+    (industry, frozenset(combo)): _build_system_prompt(industry, frozenset(combo))
+    for industry in (*INDUSTRY_PROMPTS, None)
+    for size in range(len(PROMPT_FEATURES) + 1)
+    for combo in itertools.combinations(sorted(PROMPT_FEATURES), size)
+}
+
+
+def _parse_response(response_text: str) -> GeneratedSite:
+    """Parse JSON from Claude's response and validate it against the GeneratedSite schema"""
 
     try:
         # Try to extract JSON from markdown code blocks or raw JSON
         json_match = None
 
-        # Try markdown JSON block first (Claude often wraps in ```json despite instructions)
-        if '```json' in response_text:
-            start = response_text.find('```json') + 7
-            end = response_text.find('```', start)
-            if end == -1:  # No closing ```, take rest of text
-                json_match = response_text[start:].strip()
-            else:
-                json_match = response_text[start:end].strip()
-        # Try markdown code block without json tag
-        elif '```' in response_text:
-            start = response_text.find('```') + 3
-            end = response_text.find('```', start)
-            if end == -1:  # No closing ```, take rest of text
-                json_match = response_text[start:].strip()
+        # Fast path: raw JSON as instructed - no fence scan, which also keeps code fences
+        # inside generated file contents (e.g. README.md) from being mistaken for a wrapper
+        if LEADING_BRACE_RE.match(response_text):
+            end = response_text.rfind('}') + 1
+            # msgspec skips surrounding whitespace itself, so a response that's just the object
+            # is decoded as-is instead of being copied into a slice first
+            if end == len(response_text) or response_text[end:].isspace():
+                json_match = response_text
             else:
-                json_match = response_text[start:end].strip()
+                json_match = response_text[response_text.find('{'):end]
+        # Try markdown code block (Claude often wraps in ```json despite instructions)
+        elif fence_match := MARKDOWN_FENCE_RE.search(response_text):
+            json_match = fence_match.group(1)
         # Try raw JSON
-        elif '{' in response_text and '"files"' in response_text:
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            json_match = response_text[start:end]
+        elif (start := response_text.find('{')) != -1 and '"files"' in response_text:
+            json_match = response_text[start:response_text.rfind('}') + 1]
 
         if json_match:
             # If JSON is incomplete (unterminated string), try to salvage it
             # by finding the last complete file entry
             try:
-                return json.loads(json_match)
-            except json.JSONDecodeError:
-                # Try to fix incomplete JSON by finding last complete object
-                if '"files": [' in json_match:
-                    # Find the last complete file object
-                    last_complete = json_match.rfind('},\n    {')
-                    if last_complete > 0:
-                        # Truncate to last complete file and close the JSON
-                        json_match = json_match[:last_complete + 1] + '\n  ]\n}'
-                        return json.loads(json_match)
+                return msgspec.json.decode(json_match, type=GeneratedSite)
+            except msgspec.ValidationError:
+                # Well-formed JSON with the wrong shape - truncating won't help
+                raise
+            except msgspec.DecodeError:
+                # Incomplete JSON (e.g. cut off mid-string) - keep every complete file object before the cut
+                salvaged_files = _salvage_files(json_match)
+                if salvaged_files:
+                    return {'files': msgspec.convert(salvaged_files, List[GeneratedFile])}
                 raise
         else:
             raise Exception('No JSON found in response')
 
-    except json.JSONDecodeError as e:
+    except msgspec.ValidationError as e:
+        raise Exception(f'Generated JSON does not match the expected schema: {str(e)}')
+    except msgspec.DecodeError as e:
         # Log the malformed JSON for debugging
-        print(f"   ⚠️  Malformed JSON from Claude:")
-        print(f"   First 500 chars: {response_text[:500]}")
-        print(f"   Last 500 chars: {response_text[-500:]}")
+        logger.warning("⚠️  Malformed JSON from Claude (%d chars): %s", len(response_text), e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First 500 chars: %s", response_text[:500])
+            logger.debug("Last 500 chars: %s", response_text[-500:])
         raise Exception(f'Failed to parse JSON: {str(e)}')
 
 
-def _extract_components(files: List[Dict[str, str]]) -> List[str]:
-    """Extract list of component names from generated files"""
-
-    components = []
+def _salvage_files(json_text: str) -> List[Any]:
+    """
+    Decode the complete items of a truncated "files" array, dropping the cut-off tail.
 
-    for file in files:
-        path = file.get('path', '')
-        if path.startswith('components/') and path.endswith('.tsx'):
-            # Extract component name from path (e.g., components/Hero.tsx -> Hero)
-            component_name = path.split('/')[-1].replace('.tsx', '')
-            components.append(component_name)
+    Walks the array one value at a time, so it doesn't depend on how Claude indents
+    or separates the entries.
+    """
 
-    return components
+    array_match = FILES_ARRAY_RE.search(json_text)
+    if not array_match:
+        return []
+
+    files = []
+    pos = array_match.end()
+    while True:
+        pos = ARRAY_SEPARATOR_RE.match(json_text, pos).end()
+        try:
+            item, pos = _json_decoder.raw_decode(json_text, pos)
+        except json.JSONDecodeError:
+            # Closing bracket or the truncated entry - everything before it is complete
+            break
+        files.append(item)
+
+    return files
@@ -4,7 +4,11 @@ Script to delete test-client-10 GitHub repo and Vercel project
 """
 
 import os
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from github import Github, GithubException, Auth
 
 # Load environment variables
@@ -14,6 +18,18 @@ GITHUB_APP_INSTALLATION_ID = os.getenv('GITHUB_APP_INSTALLATION_ID')
 VERCEL_TOKEN = os.getenv('VERCEL_TOKEN')
 VERCEL_TEAM_ID = os.getenv('VERCEL_TEAM_ID')
 
+# Shared session so bulk deletes reuse TLS connections (retries on rate limits / 5xx)
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+))
+
 
 def get_github_client():
     """Get authenticated GitHub client using GitHub App"""
@@ -60,7 +76,7 @@ def delete_vercel_project(project_id: str):
     if VERCEL_TEAM_ID:
         url += f"?teamId={VERCEL_TEAM_ID}"
 
-    response = requests.delete(url, headers=headers)
+    response = _session.delete(url, headers=headers)
 
     if response.status_code in (200, 204):
         return {'success': True, 'project_id': project_id}
@@ -73,22 +89,40 @@ def delete_vercel_project(project_id: str):
         }
 
 
-if __name__ == '__main__':
+def delete_vercel_projects(project_ids: list) -> list:
+    """Delete several Vercel projects concurrently over the shared session"""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(executor.map(delete_vercel_project, project_ids))
+
+
+async def delete_client(org: str, client_slug: str):
+    """Delete a client's GitHub repo and Vercel project concurrently"""
+    # Both SDK calls are blocking and hit different services, so run them side by side
+    return await asyncio.gather(
+        asyncio.to_thread(delete_github_repo, org, client_slug),
+        asyncio.to_thread(delete_vercel_project, client_slug),
+        return_exceptions=True
+    )
+
+
+async def main():
     print("Deleting test-client-10...")
     print()
 
-    # Delete GitHub repo
-    print("1. Deleting GitHub repo darx-sites/test-client-10...")
-    github_result = delete_github_repo('darx-sites', 'test-client-10')
+    print("Deleting GitHub repo darx-sites/test-client-10 and Vercel project test-client-10...")
+    github_result, vercel_result = await delete_client('darx-sites', 'test-client-10')
+
+    # GitHub repo
+    if isinstance(github_result, Exception):
+        github_result = {'success': False, 'error': str(github_result)}
     if github_result['success']:
         print(f"   ✅ GitHub repo deleted: {github_result['repo']}")
     else:
         print(f"   ❌ GitHub error: {github_result['error']}")
-    print()
 
-    # Delete Vercel project
-    print("2. Deleting Vercel project test-client-10...")
-    vercel_result = delete_vercel_project('test-client-10')
+    # Vercel project
+    if isinstance(vercel_result, Exception):
+        vercel_result = {'success': False, 'error': str(vercel_result)}
     if vercel_result['success']:
         note = vercel_result.get('note', '')
         print(f"   ✅ Vercel project deleted: {vercel_result['project_id']} {note}")
@@ -97,3 +131,7 @@ if __name__ == '__main__':
     print()
 
     print("Done!")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
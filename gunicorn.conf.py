@@ -0,0 +1,12 @@
+"""
+Gunicorn server hooks (picked up automatically from the working directory)
+"""
+
+import threading
+
+
+def post_fork(server, worker):
+    """Open the Anthropic connection in each new worker so its first generation doesn't pay the TLS handshake"""
+    from darx.clients.vertex_ai import warm_client
+
+    threading.Thread(target=warm_client, name='anthropic-warmup', daemon=True).start()
@@ -5,79 +5,129 @@ Generates production-ready Next.js websites with Builder.io integration.
 """
 
 import os
-import json
 import time
+import hashlib
+import uuid
+import redis
+import msgspec
 import requests
 import secrets
-from flask import Flask, request, jsonify
+import threading
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import quote, urlencode
+from flask import Flask, Response, current_app, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_session import Session
-from typing import Dict, Any
+from flask_cors import CORS
+from typing import Dict, List, Any, Optional, Tuple, Annotated
 from darx.clients.vertex_ai import generate_site_code
 from darx.clients.github import create_github_repo, push_to_github
 from darx.clients.vercel import deploy_to_vercel
 from darx.clients.site_editor import edit_site
-from darx.clients.gcp import store_backup, log_generation
+from darx.clients.gcp import store_backup, log_generation, encode_pubsub_message
+from darx.clients.builderio_space import create_space
 from onboarding import onboarding_bp
 from auth import init_oauth
 from auth_routes import auth_bp, init_auth_routes
-from google.cloud import secretmanager, pubsub_v1
+from google.cloud import secretmanager
+from google.auth.transport.requests import Request as GoogleAuthRequest
+from google.oauth2 import id_token
+from google.auth import jwt as google_jwt
 
 # Initialize structured logging from darx_core
-from darx_core import setup_logging, get_logger
-logger = setup_logging('darx-site-generator', log_level=os.environ.get('LOG_LEVEL', 'INFO'))
+from darx_core import setup_logging, get_logger, get_supabase_client
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+logger = setup_logging('darx-site-generator', log_level=LOG_LEVEL)
+DEBUG_LOGGING = LOG_LEVEL.upper() == 'DEBUG'
 
 # Configuration
 PROJECT_ID = os.getenv('GCP_PROJECT', 'sylvan-journey-474401-f9')
 
 
+# Contextual help for failed generations, by the service named in the error message.
+# Checked in order, so a message naming several services gets the first match.
+ERROR_HELP = (
+    (('Vercel',), {
+        'message': 'Vercel deployment or API error',
+        'next_steps': [
+            'Check Vercel API token is valid',
+            'Verify project permissions',
+            'Review Vercel deployment logs'
+        ]
+    }),
+    (('Builder.io', 'BuilderIO'), {
+        'message': 'Builder.io API error',
+        'next_steps': [
+            'Check Builder.io API key is valid',
+            'Verify space permissions',
+            'Check Builder.io space quotas'
+        ]
+    }),
+    (('GitHub',), {
+        'message': 'GitHub API error',
+        'next_steps': [
+            'Check GitHub token is valid',
+            'Verify repository permissions',
+            'Check rate limits'
+        ]
+    }),
+)
+
+DEFAULT_ERROR_HELP = {
+    'message': 'Unexpected error during site generation',
+    'next_steps': [
+        'Review error logs',
+        'Check service configurations',
+        'Contact support if error persists'
+    ]
+}
+
+
 def _generate_error_help(error_type: str, error_msg: str) -> Dict:
     """
     Generate contextual help based on error type.
     """
-    if 'Vercel' in error_msg:
-        return {
-            'message': 'Vercel deployment or API error',
-            'next_steps': [
-                'Check Vercel API token is valid',
-                'Verify project permissions',
-                'Review Vercel deployment logs'
-            ]
-        }
+    for markers, help_info in ERROR_HELP:
+        if any(marker in error_msg for marker in markers):
+            return help_info
 
-    elif 'Builder.io' in error_msg or 'BuilderIO' in error_msg:
-        return {
-            'message': 'Builder.io API error',
-            'next_steps': [
-                'Check Builder.io API key is valid',
-                'Verify space permissions',
-                'Check Builder.io space quotas'
-            ]
-        }
+    return DEFAULT_ERROR_HELP
 
-    elif 'GitHub' in error_msg:
-        return {
-            'message': 'GitHub API error',
-            'next_steps': [
-                'Check GitHub token is valid',
-                'Verify repository permissions',
-                'Check rate limits'
-            ]
-        }
 
-    return {
-        'message': 'Unexpected error during site generation',
-        'next_steps': [
-            'Review error logs',
-            'Check service configurations',
-            'Contact support if error persists'
-        ]
-    }
+# Secret Manager client is shared across requests; Builder.io keys are cached briefly per (project, prefix)
+BUILDER_KEYS_TTL = 300  # seconds
+_secret_client = None
+_secret_client_lock = threading.Lock()
+_builder_keys_cache = {}
+_builder_keys_cache_lock = threading.Lock()
+_secret_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='secret-manager')
+
+
+def _get_secret_client() -> secretmanager.SecretManagerServiceClient:
+    """Get or create the shared Secret Manager client"""
+    global _secret_client
+    if _secret_client is None:
+        with _secret_client_lock:
+            if _secret_client is None:
+                _secret_client = secretmanager.SecretManagerServiceClient()
+    return _secret_client
+
+
+def _access_secret(name: str) -> str:
+    """Read a secret version's payload"""
+    response = _get_secret_client().access_secret_version(name=name)
+    return response.payload.data.decode('UTF-8')
 
 
 def get_builder_keys_from_secret_manager(project_id: str, secret_prefix: str = '') -> Dict[str, str]:
     """
     Retrieve Builder.io keys from Secret Manager
 
+    Successful lookups are cached for BUILDER_KEYS_TTL seconds.
+
     Args:
         project_id: GCP project containing the secrets
         secret_prefix: Prefix for secret names (e.g., 'client-slug-' for INTAKE mode)
@@ -85,36 +135,92 @@ def get_builder_keys_from_secret_manager(project_id: str, secret_prefix: str = '
     Returns:
         {'public_key': '...', 'private_key': '...'}
     """
-    secret_client = secretmanager.SecretManagerServiceClient()
+    cache_key = (project_id, secret_prefix)
+    with _builder_keys_cache_lock:
+        cached = _builder_keys_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
 
     try:
-        # Retrieve public key
+        # Retrieve both keys at once - the two RPCs are independent
         public_key_name = f"projects/{project_id}/secrets/{secret_prefix}builder-public-key/versions/latest"
-        public_key_response = secret_client.access_secret_version(name=public_key_name)
-        public_key = public_key_response.payload.data.decode('UTF-8')
-
-        # Retrieve private key
         private_key_name = f"projects/{project_id}/secrets/{secret_prefix}builder-private-key/versions/latest"
-        private_key_response = secret_client.access_secret_version(name=private_key_name)
-        private_key = private_key_response.payload.data.decode('UTF-8')
+        public_key_future = _secret_executor.submit(_access_secret, public_key_name)
+        private_key = _access_secret(private_key_name)
+        public_key = public_key_future.result()
 
-        print(f"   ✅ Retrieved Builder.io keys from Secret Manager")
-        print(f"   ℹ️  Project: {project_id}, Prefix: {secret_prefix}")
+        logger.info("✅ Retrieved Builder.io keys from Secret Manager")
+        logger.info("ℹ️  Project: %s, Prefix: %s", project_id, secret_prefix)
 
-        return {
+        builder_keys = {
             'public_key': public_key,
             'private_key': private_key
         }
+        with _builder_keys_cache_lock:
+            _builder_keys_cache[cache_key] = (time.monotonic() + BUILDER_KEYS_TTL, builder_keys)
+        return builder_keys
 
     except Exception as e:
-        print(f"   ⚠️  Failed to retrieve Builder.io keys from Secret Manager: {str(e)}")
+        logger.warning("⚠️  Failed to retrieve Builder.io keys from Secret Manager: %s", e)
         return {'public_key': None, 'private_key': None}
 
 
+def _load_flask_secret_key() -> str:
+    """
+    Load the Flask session signing key, once at startup
+
+    FLASK_SECRET_KEY wins if set; otherwise the flask-secret-key secret in Secret Manager.
+    A random key is only generated as a last resort (local dev), since it differs per
+    instance and invalidates sessions whenever a request lands on another one.
+    """
+    secret_key = os.getenv('FLASK_SECRET_KEY')
+    if secret_key:
+        return secret_key
+
+    try:
+        return _access_secret(f"projects/{PROJECT_ID}/secrets/flask-secret-key/versions/latest")
+    except Exception as e:
+        logger.warning("⚠️  No FLASK_SECRET_KEY or flask-secret-key secret (%s) - using a random per-instance key", e)
+        return secrets.token_hex(32)
+
+
+def _get_builder_keys(mode: str, gcp_project_id: str, secret_prefix: str) -> Tuple[str, str]:
+    """
+    Resolve the Builder.io keys for a generation
+
+    Returns:
+        (public_key, private_key)
+    """
+    if mode == 'INTAKE' and gcp_project_id:
+        # INTAKE mode: Retrieve from shared project's Secret Manager
+        builder_keys = get_builder_keys_from_secret_manager(gcp_project_id, secret_prefix)
+        return builder_keys.get('public_key'), builder_keys.get('private_key')
+
+    # DEDICATED mode or fallback: Use environment variables
+    logger.info("ℹ️  Using environment variables for Builder.io keys")
+    return os.getenv('BUILDER_IO_PUBLIC_KEY'), os.getenv('BUILDER_IO_PRIVATE_KEY')
+
+
 LOCATION = os.getenv('GCP_LOCATION', 'us-central1')
 GITHUB_ORG = os.getenv('GITHUB_ORG', 'darx-sites')
 DARX_REASONING_URL = os.getenv('DARX_REASONING_URL', 'https://darx-reasoning-474964350921.us-central1.run.app')
 
+# Builder.io model write API
+BUILDER_MODELS_URL = 'https://builder.io/api/v1/models'
+
+# Settings for a newly created page model (name, id and preview URL are filled in per site)
+BUILDER_PAGE_MODEL_SETTINGS = {
+    'kind': 'page',
+    'publicReadable': True,
+    'showTargeting': True,
+    'showMetrics': True,
+    'allowHeatmap': True
+}
+
+# Shared HTTP session for outbound API calls - keeps TLS connections to builder.io alive between requests
+_http_session = requests.Session()
+_http_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=16))
+
 
 def _configure_builder_preview_url(
     staging_url: str,
@@ -134,89 +240,212 @@ def _configure_builder_preview_url(
         model_name: Model to configure (default: 'page')
     """
     if not builder_public_key or not builder_private_key:
-        print(f"   ⚠️  Builder.io keys not available - skipping preview URL configuration")
+        logger.warning("⚠️  Builder.io keys not available - skipping preview URL configuration")
         return
 
+    # requests sets Content-Type for json= bodies, so only the auth header varies per call
+    headers = {'Authorization': f'Bearer {builder_private_key}'}
+
     try:
-        # Check if model exists
-        check_url = f"https://cdn.builder.io/api/v1/models/{model_name}?apiKey={builder_public_key}"
-        check_response = requests.get(check_url, timeout=30)
+        # Update the preview URL directly - the model normally exists already, so this is
+        # usually the only request; a 404 means it has to be created first
+        update_response = _http_session.put(
+            f"{BUILDER_MODELS_URL}/{model_name}",
+            headers=headers,
+            json={'examplePageUrl': staging_url},
+            timeout=30
+        )
 
-        if check_response.status_code == 404:
+        if update_response.status_code == 404:
             # Model doesn't exist - create it
-            print(f"   📝 Creating '{model_name}' model with preview URL...")
-
-            create_url = "https://builder.io/api/v1/models"
-            headers = {
-                'Authorization': f'Bearer {builder_private_key}',
-                'Content-Type': 'application/json'
-            }
+            logger.info("📝 Creating '%s' model with preview URL...", model_name)
 
             payload = {
+                **BUILDER_PAGE_MODEL_SETTINGS,
                 'name': model_name.title(),
                 'id': model_name,
-                'kind': 'page',
-                'examplePageUrl': staging_url,
-                'publicReadable': True,
-                'showTargeting': True,
-                'showMetrics': True,
-                'allowHeatmap': True
+                'examplePageUrl': staging_url
             }
 
-            create_response = requests.post(
-                create_url,
+            create_response = _http_session.post(
+                BUILDER_MODELS_URL,
                 headers=headers,
                 json=payload,
                 timeout=30
             )
 
             create_response.raise_for_status()
-            print(f"   ✅ Created '{model_name}' model with preview URL: {staging_url}")
+            logger.info("✅ Created '%s' model with preview URL: %s", model_name, staging_url)
 
         else:
-            # Model exists - update preview URL
-            check_response.raise_for_status()
-            model_data = check_response.json()
-
-            current_preview_url = model_data.get('examplePageUrl')
-            print(f"   ℹ️  Current preview URL: {current_preview_url or 'Not set'}")
-
-            # Update the model with the preview URL
-            update_url = f"https://builder.io/api/v1/models/{model_name}"
-            headers = {
-                'Authorization': f'Bearer {builder_private_key}',
-                'Content-Type': 'application/json'
-            }
-
-            payload = {
-                'examplePageUrl': staging_url
-            }
-
-            update_response = requests.put(
-                update_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-
             update_response.raise_for_status()
-            print(f"   ✅ Updated '{model_name}' model preview URL: {staging_url}")
+            logger.info("✅ Updated '%s' model preview URL: %s", model_name, staging_url)
 
     except requests.exceptions.HTTPError as e:
         error_msg = f"{e.response.status_code} - {e.response.text if hasattr(e, 'response') else str(e)}"
-        print(f"   ⚠️  Builder.io API error: {error_msg}")
+        logger.warning("⚠️  Builder.io API error: %s", error_msg)
         raise
     except Exception as e:
-        print(f"   ⚠️  Failed to configure preview URL: {str(e)}")
+        logger.warning("⚠️  Failed to configure preview URL: %s", e)
         raise
 
 
+# Recently validated active clients, so repeat generations skip the Supabase status query.
+# Only "active" results are cached - not-found / not-ready clients are re-checked every time.
+CLIENT_STATUS_TTL = 30  # seconds
+_active_clients_cache = {}
+_active_clients_cache_lock = threading.Lock()
+
+
+def _get_cached_active_client(client_slug: str) -> Optional[Dict[str, Any]]:
+    """Return the cached client record if the client was validated as active recently"""
+    with _active_clients_cache_lock:
+        cached = _active_clients_cache.get(client_slug)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def _cache_active_client(client_slug: str, client_record: Dict[str, Any]) -> None:
+    """Remember a client validated as active for CLIENT_STATUS_TTL seconds"""
+    with _active_clients_cache_lock:
+        _active_clients_cache[client_slug] = (time.monotonic() + CLIENT_STATUS_TTL, client_record)
+
+
+# Process-wide pool for blocking SDK calls that run alongside a request (repo creation,
+# key lookups) or after it (backups, metrics), instead of a new pool per request.
+# Tasks on it must not wait on other tasks on it - nested waits could exhaust the pool.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='darx-worker')
+
+
+def _log_background_failure(future) -> None:
+    """Done-callback: surface exceptions from background tasks, which nothing else waits on"""
+    error = future.exception()
+    if error:
+        logger.warning("⚠️  Background task failed: %s", error)
+
+
+def _run_in_background(fn, *args, **kwargs) -> None:
+    """Run fn on the shared executor without waiting for it"""
+    _executor.submit(fn, *args, **kwargs).add_done_callback(_log_background_failure)
+
+
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class GenerateRequest(msgspec.Struct):
+    """Request body for POST / (site generation)
+
+    Optional fields accept an explicit null, which means the same as leaving them out.
+    """
+    project_name: NonEmptyStr
+    requirements: NonEmptyStr
+    client_info: Optional[Dict[str, Any]] = None
+    industry: Optional[str] = None
+    features: Optional[List[str]] = None
+    builder_space_public_key: Optional[str] = None  # Optional: use existing Builder.io Space
+    mode: Optional[str] = None  # 'INTAKE' or 'DEDICATED'
+    gcp_project_id: Optional[str] = None  # Where to retrieve secrets from (INTAKE mode)
+    secret_prefix: Optional[str] = None  # Prefix for secret names (e.g., 'client-slug-')
+
+    def __post_init__(self):
+        if self.client_info is None:
+            self.client_info = {}
+        if self.industry is None:
+            self.industry = 'general'
+        if self.features is None:
+            self.features = []
+        if self.mode is None:
+            self.mode = 'DEDICATED'
+        if self.secret_prefix is None:
+            self.secret_prefix = ''
+
+
+class EditRequest(msgspec.Struct):
+    """Request body for POST /edit"""
+    project_name: NonEmptyStr
+    edit_type: NonEmptyStr
+    changes: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        if self.changes is None:
+            self.changes = {}
+
+
+def _contains_date(obj: Any) -> bool:
+    """Whether a JSON payload holds a date/datetime anywhere in its dicts and lists"""
+    if isinstance(obj, date):
+        return True
+    if isinstance(obj, dict):
+        return any(_contains_date(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_date(value) for value in obj)
+    return False
+
+
+class MsgspecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes/decodes with msgspec instead of the stdlib json module
+
+    Output matches DefaultJSONProvider: keys are sorted when sort_keys is set, and types
+    msgspec can't encode go through Flask's default hook. msgspec always writes dates as
+    ISO 8601, so payloads containing them use the stdlib encoder to keep Flask's HTTP-date format.
+    """
+
+    def _encode(self, obj: Any, sort_keys: bool, indent: Optional[int] = None) -> bytes:
+        if _contains_date(obj):
+            separators = (',', ':') if indent is None else None
+            return super().dumps(obj, sort_keys=sort_keys, indent=indent, separators=separators).encode('utf-8')
+        data = msgspec.json.encode(obj, enc_hook=self.default, order='sorted' if sort_keys else None)
+        if indent is not None:
+            data = msgspec.json.format(data, indent=indent)
+        return data
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Flask asks for compact separators, which is msgspec's default output format
+        kwargs.pop('separators', None)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        indent = kwargs.pop('indent', None)
+        if kwargs:
+            # Anything else (a custom default, ensure_ascii, ...) needs the stdlib encoder
+            return super().dumps(obj, sort_keys=sort_keys, indent=indent, **kwargs)
+        return self._encode(obj, sort_keys, indent).decode('utf-8')
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        # msgspec.DecodeError is a ValueError, so Flask still turns bad JSON into a 400
+        return msgspec.json.decode(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Used by jsonify() - build the body straight from msgspec's bytes instead of
+        # decoding to str in dumps() only for the Response to encode it again
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs
+
+        indent = 2 if (self.compact is None and current_app.debug) or self.compact is False else None
+        body = self._encode(obj, self.sort_keys, indent) + b'\n'
+        return current_app.response_class(body, mimetype=self.mimetype)
+
+
 # Create Flask app
 app = Flask(__name__)
+app.json = MsgspecJSONProvider(app)
 
 # Session configuration
-app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(32))
-app.config['SESSION_TYPE'] = 'filesystem'
+app.config['SECRET_KEY'] = _load_flask_secret_key()
+# Sessions live in Redis (Memorystore) when REDIS_URL is set, so every Cloud Run
+# instance sees them; the filesystem backend is only for local development
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.Redis.from_url(REDIS_URL, max_connections=64)
+else:
+    app.config['SESSION_TYPE'] = 'filesystem'
+app.config['SESSION_USE_SIGNER'] = True
 app.config['SESSION_COOKIE_SECURE'] = True  # Require HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
@@ -230,8 +459,20 @@ init_auth_routes(google)
 app.register_blueprint(auth_bp)
 app.register_blueprint(onboarding_bp)
 
+# CORS for the generate and edit endpoints - Flask answers their OPTIONS preflights
+# automatically and the extension adds the headers to preflights and responses alike
+CORS(
+    app,
+    resources=[r'^/$', r'^/edit$'],
+    origins='*',
+    send_wildcard=True,  # Answer with a literal '*', as the old preflight handler did, instead of echoing the Origin
+    methods=['POST', 'OPTIONS'],
+    allow_headers=['Content-Type'],
+    max_age=86400  # Browsers cap this (e.g. Chrome at 2h), but fewer repeat preflights either way
+)
 
-@app.route('/', methods=['POST', 'OPTIONS'])
+
+@app.route('/', methods=['POST'])
 def generate_site():
     """
     Main HTTP endpoint for website generation.
@@ -256,93 +497,109 @@ def generate_site():
     }
     """
 
-    # Handle CORS preflight
-    if request.method == 'OPTIONS':
-        return _cors_response()
+    # Parse and validate the request body in one pass
+    body = request.get_data()
+    if not body:
+        return jsonify({'error': 'No JSON data provided'}), 400
 
-    # Parse request
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-
-        project_name = data.get('project_name')
-        client_info = data.get('client_info', {})
-        requirements = data.get('requirements')
-        industry = data.get('industry', 'general')
-        features = data.get('features', [])
-        builder_space_public_key = data.get('builder_space_public_key')  # Optional: use existing Builder.io Space
-
-        # INTAKE mode support
-        mode = data.get('mode', 'DEDICATED')  # 'INTAKE' or 'DEDICATED'
-        gcp_project_id = data.get('gcp_project_id')  # Where to retrieve secrets from
-        secret_prefix = data.get('secret_prefix', '')  # Prefix for secret names (e.g., 'client-slug-')
-
-        if not project_name or not requirements:
-            return jsonify({
-                'error': 'Missing required fields: project_name, requirements'
-            }), 400
-
-    except Exception as e:
+        generate_request = msgspec.json.decode(body, type=GenerateRequest)
+    except msgspec.ValidationError as e:
+        return jsonify({
+            'error': f'Missing or invalid fields (project_name and requirements are required): {str(e)}'
+        }), 400
+    except msgspec.DecodeError as e:
         return jsonify({'error': f'Invalid request: {str(e)}'}), 400
 
+    project_name = generate_request.project_name
+    client_info = generate_request.client_info
+    requirements = generate_request.requirements
+    industry = generate_request.industry
+    features = generate_request.features
+    builder_space_public_key = generate_request.builder_space_public_key
+
+    # INTAKE mode support
+    mode = generate_request.mode
+    gcp_project_id = generate_request.gcp_project_id
+    secret_prefix = generate_request.secret_prefix
+
     # CRITICAL FIX: Workflow validation (Fix #4)
     # Check if client exists and is active before allowing site generation
-    try:
-        from darx_core import get_supabase_client
-        supabase = get_supabase_client()
-
-        if supabase:
-            # Query for client record using client_slug (which is project_name)
-            client_check = supabase.table('clients')\
-                .select('client_slug, name, status, onboarding_completed')\
-                .eq('client_slug', project_name)\
-                .execute()
-
-            if not client_check.data or len(client_check.data) == 0:
-                return jsonify({
-                    'error': 'Client not found',
-                    'message': f'No client record found for slug: {project_name}',
-                    'recommendation': 'Please onboard the client first using the client_onboarding tool',
-                    'required_step': 'onboard_client',
-                    'blocked': True
-                }), 400
-
-            client_record = client_check.data[0]
-
-            # Check if client is in active status
-            if client_record.get('status') != 'active':
-                current_status = client_record.get('status', 'unknown')
-                return jsonify({
-                    'error': 'Client not ready for site generation',
-                    'message': f'Client status is "{current_status}" (expected "active")',
-                    'current_status': current_status,
-                    'client_slug': project_name,
-                    'recommendation': {
-                        'pending_provisioning': 'Wait for provisioning workflow to complete',
-                        'pending_onboarding': 'Complete onboarding first',
-                        'inactive': 'Client has been deactivated',
-                        'unknown': 'Check client status in Supabase'
-                    }.get(current_status, 'Contact support'),
-                    'blocked': True
-                }), 400
-
-            print(f"✅ Client validation passed: {project_name} (status: active)")
+    # Clients validated as active within the last CLIENT_STATUS_TTL seconds skip the query
+    client_record = _get_cached_active_client(project_name)
+    if client_record is not None:
+        logger.info("✅ Client validation passed: %s (status: active, cached)", project_name)
+    else:
+        try:
+            supabase = get_supabase_client()
+
+            if supabase:
+                # Query for client record using client_slug (which is project_name) - also
+                # fetches the columns Step 8 needs, so the record is only read once
+                client_check = supabase.table('clients')\
+                    .select('id, client_slug, name, status, onboarding_completed, contact_email')\
+                    .eq('client_slug', project_name)\
+                    .execute()
+
+                if not client_check.data or len(client_check.data) == 0:
+                    return jsonify({
+                        'error': 'Client not found',
+                        'message': f'No client record found for slug: {project_name}',
+                        'recommendation': 'Please onboard the client first using the client_onboarding tool',
+                        'required_step': 'onboard_client',
+                        'blocked': True
+                    }), 400
+
+                client_record = client_check.data[0]
+
+                # Check if client is in active status
+                if client_record.get('status') != 'active':
+                    current_status = client_record.get('status', 'unknown')
+                    return jsonify({
+                        'error': 'Client not ready for site generation',
+                        'message': f'Client status is "{current_status}" (expected "active")',
+                        'current_status': current_status,
+                        'client_slug': project_name,
+                        'recommendation': {
+                            'pending_provisioning': 'Wait for provisioning workflow to complete',
+                            'pending_onboarding': 'Complete onboarding first',
+                            'inactive': 'Client has been deactivated',
+                            'unknown': 'Check client status in Supabase'
+                        }.get(current_status, 'Contact support'),
+                        'blocked': True
+                    }), 400
+
+                logger.info("✅ Client validation passed: %s (status: active)", project_name)
+                _cache_active_client(project_name, client_record)
 
-    except Exception as e:
-        print(f"⚠️  Client validation check failed: {e}")
-        # Continue anyway if validation fails - this is a safety feature, not critical
-        # But log the warning so we know validation isn't working
+        except Exception as e:
+            logger.warning("⚠️  Client validation check failed: %s", e)
+            # Continue anyway if validation fails - this is a safety feature, not critical
+            # But log the warning so we know validation isn't working
 
-    print(f"\n🚀 Starting generation for: {project_name}")
-    print(f"   Industry: {industry}")
-    print(f"   Features: {', '.join(features)}")
+    logger.info("🚀 Starting generation for: %s (industry: %s, features: %s)", project_name, industry, features)
 
-    start_time = time.time()
+    start_time = time.monotonic()
 
     try:
+        # Steps 1, 2 and 4 don't depend on each other - create the repo and fetch the
+        # Builder.io keys on the shared executor while Claude generates, then join before the push
+
+        # Step 2: Create GitHub repository
+        logger.info("📦 Creating GitHub repository: %s/%s", GITHUB_ORG, project_name)
+        github_future = _executor.submit(
+            create_github_repo,
+            org=GITHUB_ORG,
+            repo_name=project_name,
+            description=f"Website for {client_info.get('client_name', project_name)}"
+        )
+
+        # Step 4: Retrieve Builder.io keys (from Secret Manager or env vars)
+        logger.info("🔑 Retrieving Builder.io credentials...")
+        builder_keys_future = _executor.submit(_get_builder_keys, mode, gcp_project_id, secret_prefix)
+
         # Step 1: Generate code with Claude
-        print("\n📝 Generating code with Claude Sonnet 4.5...")
+        logger.info("📝 Generating code with Claude Sonnet 4.5...")
         generation_result = generate_site_code(
             project_name=project_name,
             requirements=requirements,
@@ -357,25 +614,20 @@ def generate_site():
         files = generation_result['files']
         components = generation_result['components']
 
-        print(f"   ✅ Generated {len(files)} files")
-        print(f"   ✅ Registered {len(components)} components")
+        logger.info("✅ Generated %s files", len(files))
+        logger.info("✅ Registered %s components", len(components))
 
-        # Step 2: Create GitHub repository
-        print(f"\n📦 Creating GitHub repository: {GITHUB_ORG}/{project_name}")
-        github_result = create_github_repo(
-            org=GITHUB_ORG,
-            repo_name=project_name,
-            description=f"Website for {client_info.get('client_name', project_name)}"
-        )
+        github_result = github_future.result()
+        builder_public_key_for_env, builder_private_key_for_env = builder_keys_future.result()
 
         if not github_result.get('success'):
             raise Exception(github_result.get('error', 'GitHub repo creation failed'))
 
         repo_url = github_result['repo_url']
-        print(f"   ✅ Repository created: {repo_url}")
+        logger.info("✅ Repository created: %s", repo_url)
 
         # Step 3: Push code to GitHub
-        print("\n⬆️  Pushing code to GitHub...")
+        logger.info("⬆️  Pushing code to GitHub...")
         push_result = push_to_github(
             org=GITHUB_ORG,
             repo_name=project_name,
@@ -386,27 +638,14 @@ def generate_site():
         if not push_result.get('success'):
             raise Exception(push_result.get('error', 'GitHub push failed'))
 
-        print("   ✅ Code pushed to GitHub")
-
-        # Step 4: Retrieve Builder.io keys (from Secret Manager or env vars)
-        print("\n🔑 Retrieving Builder.io credentials...")
-        if mode == 'INTAKE' and gcp_project_id:
-            # INTAKE mode: Retrieve from shared project's Secret Manager
-            builder_keys = get_builder_keys_from_secret_manager(gcp_project_id, secret_prefix)
-            builder_public_key_for_env = builder_keys.get('public_key')
-            builder_private_key_for_env = builder_keys.get('private_key')
-        else:
-            # DEDICATED mode or fallback: Use environment variables
-            builder_public_key_for_env = os.getenv('BUILDER_IO_PUBLIC_KEY')
-            builder_private_key_for_env = os.getenv('BUILDER_IO_PRIVATE_KEY')
-            print(f"   ℹ️  Using environment variables for Builder.io keys")
+        logger.info("✅ Code pushed to GitHub")
 
         # Step 5: Deploy to Vercel
-        print("\n🚀 Deploying to Vercel...")
+        logger.info("🚀 Deploying to Vercel...")
 
         # Determine Builder.io space mode based on provisioning mode
         builder_space_mode = 'SHARED' if mode == 'INTAKE' else 'DEDICATED'
-        print(f"   ℹ️  Builder.io space mode: {builder_space_mode}")
+        logger.info("ℹ️  Builder.io space mode: %s", builder_space_mode)
 
         vercel_result = deploy_to_vercel(
             project_name=project_name,
@@ -424,10 +663,10 @@ def generate_site():
             raise Exception(vercel_result.get('error', 'Vercel deployment failed'))
 
         staging_url = vercel_result['staging_url']
-        print(f"   ✅ Deployed to: {staging_url}")
+        logger.info("✅ Deployed to: %s", staging_url)
 
         # Step 5.5: Configure Builder.io preview URL for visual editing
-        print("\n🔧 Configuring Builder.io preview URL...")
+        logger.info("🔧 Configuring Builder.io preview URL...")
         try:
             # Use correct model name based on space mode
             preview_model_name = 'client-page' if builder_space_mode == 'SHARED' else 'page'
@@ -438,11 +677,11 @@ def generate_site():
                 model_name=preview_model_name
             )
         except Exception as e:
-            print(f"   ⚠️  Failed to configure preview URL: {str(e)}")
-            print(f"   ℹ️  Visual editing may not work properly")
+            logger.warning("⚠️  Failed to configure preview URL: %s", e)
+            logger.info("ℹ️  Visual editing may not work properly")
 
         # Step 6: Configure Builder.io visual editor
-        print("\n🎨 Setting up Builder.io visual editor...")
+        logger.info("🎨 Setting up Builder.io visual editor...")
         builder_space_id = project_name  # Default fallback
         builder_public_key = builder_public_key_for_env  # Use retrieved keys
         builder_private_key = builder_private_key_for_env  # Use retrieved keys
@@ -450,17 +689,15 @@ def generate_site():
 
         if builder_space_public_key:
             # User provided an existing Builder.io Space key - use it directly
-            print(f"   ✅ Using existing Builder.io Space")
-            print(f"   ℹ️  Public key: {builder_space_public_key[:20]}...")
+            logger.info("✅ Using existing Builder.io Space")
+            logger.info("ℹ️  Public key: %s...", builder_space_public_key[:20])
             builder_public_key = builder_space_public_key
             builder_space_id = project_name
             builder_space_url = f"https://builder.io/content"
-            print(f"   ℹ️  Visual editing will be available with your existing Space")
+            logger.info("ℹ️  Visual editing will be available with your existing Space")
         else:
             # No key provided - attempt to create a new Space (requires Enterprise account)
             try:
-                from darx.clients.builderio_space import create_space
-
                 space_name = client_info.get('client_name') or project_name.replace('-', ' ').title()
 
                 builder_result = create_space(
@@ -474,40 +711,44 @@ def generate_site():
                     builder_private_key = builder_result.get('private_key')
                     builder_space_url = builder_result.get('space_url')
 
-                    print(f"   ✅ Builder.io space created: {builder_space_id}")
-                    print(f"   ℹ️  Public key: {builder_public_key}")
-                    print(f"   ℹ️  Space URL: {builder_space_url}")
+                    logger.info("✅ Builder.io space created: %s", builder_space_id)
+                    logger.info("ℹ️  Public key: %s", builder_public_key)
+                    logger.info("ℹ️  Space URL: %s", builder_space_url)
                 else:
                     error_msg = builder_result.get('error', 'Unknown error')
-                    print(f"   ⚠️  Builder.io Space creation failed: {error_msg}")
+                    logger.warning("⚠️  Builder.io Space creation failed: %s", error_msg)
                     # Check if this is the Enterprise limitation
                     if '401' in error_msg or 'Invalid key' in error_msg or 'Unauthorized' in error_msg:
-                        print(f"   ℹ️  NOTE: Programmatic Space creation requires a Builder.io Enterprise account.")
-                        print(f"   ℹ️  To enable visual editing, create a Space at builder.io and provide the public key.")
-                        print(f"   ℹ️  Pass 'builder_space_public_key' parameter with your Space's public key (starts with 'pub-').")
-                    print(f"   ℹ️  Site will still work, but visual editing won't be available")
+                        logger.info("ℹ️  NOTE: Programmatic Space creation requires a Builder.io Enterprise account.")
+                        logger.info("ℹ️  To enable visual editing, create a Space at builder.io and provide the public key.")
+                        logger.info("ℹ️  Pass 'builder_space_public_key' parameter with your Space's public key (starts with 'pub-').")
+                    logger.info("ℹ️  Site will still work, but visual editing won't be available")
 
             except Exception as e:
-                print(f"   ⚠️  Builder.io setup failed: {str(e)}")
-                print(f"   ℹ️  To enable visual editing, create a Space at builder.io and provide the public key.")
-                print(f"   ℹ️  Site will still work, but visual editing won't be available")
+                logger.warning("⚠️  Builder.io setup failed: %s", e)
+                logger.info("ℹ️  To enable visual editing, create a Space at builder.io and provide the public key.")
+                logger.info("ℹ️  Site will still work, but visual editing won't be available")
+
+        # Steps 6 and 7 don't affect the response - run them in the background
+        generation_time = time.monotonic() - start_time
 
         # Step 6: Store backup in GCS
-        print("\n💾 Storing backup in Cloud Storage...")
-        backup_result = store_backup(
+        logger.info("💾 Storing backup in Cloud Storage...")
+        _run_in_background(
+            store_backup,
             project_name=project_name,
             files=files,
             metadata={
                 'industry': industry,
                 'features': features,
                 'components': components,
-                'generation_time': time.time() - start_time
+                'generation_time': generation_time
             }
         )
 
         # Step 7: Log generation metrics
-        generation_time = time.time() - start_time
-        log_generation(
+        _run_in_background(
+            log_generation,
             project_name=project_name,
             industry=industry,
             components=len(components),
@@ -518,37 +759,24 @@ def generate_site():
             build_state=vercel_result.get('build_state')
         )
 
-        print(f"\n✨ Generation complete! ({generation_time:.2f}s)")
+        logger.info("✨ Generation complete! (%.2fs)", generation_time)
 
         # Step 8: Queue provisioning via Pub/Sub
-        print("\n📤 Queuing provisioning job...")
+        logger.info("📤 Queuing provisioning job...")
         try:
-            from darx_core import get_supabase_client
-
-            # Try to get client record from Supabase
+            # Reuse the client record fetched during validation
             client_id = None
             contact_email = client_info.get('contact_email', 'unknown@example.com')
 
-            try:
-                supabase = get_supabase_client()
-                if supabase:
-                    result = supabase.table('clients')\
-                        .select('id, contact_email')\
-                        .eq('client_slug', project_name)\
-                        .execute()
-
-                    if result.data and len(result.data) > 0:
-                        client_id = result.data[0]['id']
-                        contact_email = result.data[0].get('contact_email', contact_email)
-                        print(f"   ℹ️  Found existing client record: {client_id}")
-            except Exception as e:
-                print(f"   ℹ️  Could not fetch client from Supabase: {str(e)}")
+            if client_record:
+                client_id = client_record['id']
+                contact_email = client_record.get('contact_email', contact_email)
+                logger.info("ℹ️  Found existing client record: %s", client_id)
 
             # If no client ID found, generate one for the message
             if not client_id:
-                import uuid
                 client_id = str(uuid.uuid4())
-                print(f"   ℹ️  Generated client ID for provisioning: {client_id}")
+                logger.info("ℹ️  Generated client ID for provisioning: %s", client_id)
 
             # REMOVED: Publishing provisioning message creates infinite loop
             # The provisioner should call the site generator, not vice versa
@@ -565,10 +793,10 @@ def generate_site():
             #     'github_repo': repo_url
             # })
 
-            print(f"   ℹ️  Site generation complete - provisioning should be handled by provisioner service")
+            logger.info("ℹ️  Site generation complete - provisioning should be handled by provisioner service")
 
         except Exception as e:
-            print(f"   ⚠️  Failed during post-deployment step: {str(e)}")
+            logger.warning("⚠️  Failed during post-deployment step: %s", e)
             # Don't fail generation if optional steps fail
 
         # Return success response
@@ -588,13 +816,12 @@ def generate_site():
         return jsonify(response), 200
 
     except Exception as e:
-        import traceback
+        generation_time = time.monotonic() - start_time
         error_msg = str(e)
-        error_trace = traceback.format_exc()
         error_type = type(e).__name__
 
-        print(f"\n❌ Generation failed: {error_msg}")
-        print(f"Traceback:\n{error_trace}")
+        # The traceback is attached to the record and only formatted if a handler emits it
+        logger.exception("❌ Generation failed: %s", error_msg)
 
         # Extract build logs from Vercel deployment failures
         build_logs = None
@@ -615,7 +842,7 @@ def generate_site():
             industry=industry,
             components=0,
             files=0,
-            generation_time=time.time() - start_time,
+            generation_time=generation_time,
             success=False,
             error=error_msg,
             build_state=build_state,
@@ -629,7 +856,7 @@ def generate_site():
             'error_type': error_type,
             'project_name': project_name,
             'timestamp': time.time(),
-            'generation_time': time.time() - start_time,
+            'generation_time': generation_time,
             'help': help_info
         }
 
@@ -642,7 +869,7 @@ def health():
     return jsonify({'status': 'healthy', 'service': 'darx-site-generator'}), 200
 
 
-@app.route('/edit', methods=['POST', 'OPTIONS'])
+@app.route('/edit', methods=['POST'])
 def edit():
     """
     HTTP endpoint for editing existing DARX Sites.
@@ -666,36 +893,33 @@ def edit():
     }
     """
 
-    # Handle CORS preflight
-    if request.method == 'OPTIONS':
-        return _cors_response()
+    # Parse and validate the request body in one pass
+    body = request.get_data()
+    if not body:
+        return jsonify({'error': 'No JSON data provided'}), 400
 
-    # Parse request
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-
-        # Log received data for debugging
-        print(f"\n📥 Received edit request data: {json.dumps(data, indent=2)}")
-
-        project_name = data.get('project_name')
-        edit_type = data.get('edit_type')
-        changes = data.get('changes', {})
+    # Log received data for debugging
+    if DEBUG_LOGGING:
+        logger.debug("📥 Received edit request data: %s", body.decode('utf-8', 'replace'))
 
-        if not project_name or not edit_type:
-            error_msg = f'Missing required fields: project_name={repr(project_name)}, edit_type={repr(edit_type)}'
-            print(f"❌ Validation error: {error_msg}")
-            return jsonify({'error': error_msg}), 400
-
-    except Exception as e:
+    try:
+        edit_request = msgspec.json.decode(body, type=EditRequest)
+    except msgspec.ValidationError as e:
+        error_msg = f'Missing or invalid fields (project_name and edit_type are required): {str(e)}'
+        logger.error("❌ Validation error: %s", error_msg)
+        return jsonify({'error': error_msg}), 400
+    except msgspec.DecodeError as e:
         error_msg = f'Invalid request: {str(e)}'
-        print(f"❌ Request parsing error: {error_msg}")
+        logger.error("❌ Request parsing error: %s", error_msg)
         return jsonify({'error': error_msg}), 400
 
-    print(f"\n✏️  Edit request for: {project_name} ({edit_type})")
+    project_name = edit_request.project_name
+    edit_type = edit_request.edit_type
+    changes = edit_request.changes
+
+    logger.info("✏️  Edit request for: %s (%s)", project_name, edit_type)
 
-    start_time = time.time()
+    start_time = time.monotonic()
 
     try:
         # Edit the site
@@ -706,19 +930,19 @@ def edit():
             github_org=GITHUB_ORG
         )
 
-        edit_time = time.time() - start_time
+        edit_time = time.monotonic() - start_time
 
         if result.get('success'):
-            print(f"✅ Edit complete! ({edit_time:.2f}s)")
+            logger.info("✅ Edit complete! (%.2fs)", edit_time)
             result['edit_time'] = edit_time
             return jsonify(result), 200
         else:
-            print(f"❌ Edit failed: {result.get('error')}")
+            logger.error("❌ Edit failed: %s", result.get('error'))
             return jsonify(result), 500
 
     except Exception as e:
         error_msg = str(e)
-        print(f"\n❌ Edit failed: {error_msg}")
+        logger.error("❌ Edit failed: %s", error_msg)
 
         return jsonify({
             'success': False,
@@ -735,26 +959,59 @@ def edit():
 REGISTRY_API_URL = os.getenv('REGISTRY_API_URL', 'https://darx-registry-slgtfcnoxq-uc.a.run.app')
 
 
+REGISTRY_METHODS = frozenset({'GET', 'POST', 'DELETE'})
+REGISTRY_TIMEOUT = (3, 30)  # (connect, read) seconds
+
+# Pooled session for registry calls - keeps connections to the registry's Cloud Run service
+# alive between requests. Gateway errors are retried for GET/DELETE (urllib3 never retries
+# POST); after the last retry the response is still returned for the caller to report.
+_registry_session = requests.Session()
+_registry_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+))
+
+# ID tokens are valid for about an hour - reuse them until shortly before they expire
+IDENTITY_TOKEN_REFRESH_MARGIN = 60  # seconds
+IDENTITY_TOKEN_DEFAULT_TTL = 3300  # seconds, if the token's exp claim can't be read
+_identity_tokens = {}
+_identity_tokens_lock = threading.Lock()
+
+
 def _get_identity_token(audience: str) -> str:
     """
     Get identity token for service-to-service authentication
 
+    Tokens are cached per audience until IDENTITY_TOKEN_REFRESH_MARGIN seconds before expiry.
+
     Args:
         audience: The URL of the service to call
 
     Returns:
         ID token string
     """
-    from google.auth.transport.requests import Request
-    from google.oauth2 import id_token
+    with _identity_tokens_lock:
+        cached = _identity_tokens.get(audience)
+    if cached and cached[1] - time.time() > IDENTITY_TOKEN_REFRESH_MARGIN:
+        return cached[0]
 
     try:
-        token = id_token.fetch_id_token(Request(), audience)
-        return token
+        token = id_token.fetch_id_token(GoogleAuthRequest(), audience)
     except Exception as e:
-        print(f"Warning: Could not get identity token: {e}")
+        logger.warning("⚠️  Could not get identity token: %s", e)
         return None
 
+    try:
+        # Only the expiry is needed - the token came straight from the metadata server
+        expires_at = google_jwt.decode(token, verify=False)['exp']
+    except Exception:
+        expires_at = time.time() + IDENTITY_TOKEN_DEFAULT_TTL
+
+    with _identity_tokens_lock:
+        _identity_tokens[audience] = (token, expires_at)
+    return token
+
 
 def _call_registry_api(endpoint: str, method: str = 'GET', data: Dict = None) -> Dict:
     """
@@ -768,6 +1025,9 @@ def _call_registry_api(endpoint: str, method: str = 'GET', data: Dict = None) ->
     Returns:
         Response JSON
     """
+    if method not in REGISTRY_METHODS:
+        return {'success': False, 'error': f'Unsupported method: {method}'}
+
     url = f"{REGISTRY_API_URL}{endpoint}"
 
     # Get identity token for authentication
@@ -777,14 +1037,13 @@ def _call_registry_api(endpoint: str, method: str = 'GET', data: Dict = None) ->
         headers['Authorization'] = f'Bearer {token}'
 
     try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, timeout=30)
-        elif method == 'POST':
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-        elif method == 'DELETE':
-            response = requests.delete(url, json=data, headers=headers, timeout=30)
-        else:
-            return {'success': False, 'error': f'Unsupported method: {method}'}
+        response = _registry_session.request(
+            method,
+            url,
+            json=data,
+            headers=headers,
+            timeout=REGISTRY_TIMEOUT
+        )
 
         # Try to parse JSON response
         try:
@@ -799,6 +1058,26 @@ def _call_registry_api(endpoint: str, method: str = 'GET', data: Dict = None) ->
         return {'success': False, 'error': f'Registry API error: {str(e)}'}
 
 
+SITE_LIST_FILTERS = ('status', 'health_status', 'limit', 'offset')
+
+# /sites?with_health probes run on their own bounded pool, so a long site list can't
+# occupy the shared executor that generations and background tasks depend on
+HEALTH_PROBE_WORKERS = 8
+_health_executor = ThreadPoolExecutor(max_workers=HEALTH_PROBE_WORKERS, thread_name_prefix='site-health')
+
+# Dashboards poll site details/health - let the browser reuse a response for a few seconds
+# and revalidate with If-None-Match after that
+SITE_CACHE_CONTROL = 'private, max-age=5, stale-while-revalidate=15'
+
+
+def _cacheable_json_response(result: Dict[str, Any]) -> Response:
+    """JSON response with an ETag of its body - a 304 when it matches If-None-Match"""
+    response = jsonify(result)
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+    response.headers['Cache-Control'] = SITE_CACHE_CONTROL
+    return response.make_conditional(request)
+
+
 @app.route('/sites', methods=['GET'])
 def list_sites():
     """
@@ -809,22 +1088,26 @@ def list_sites():
         - health_status: Filter by health (healthy, degraded, down)
         - limit: Max results (default 50)
         - offset: Pagination offset
+        - with_health: If set, include each site's current health under 'health'
     """
-    # Build query string
-    params = []
-    if request.args.get('status'):
-        params.append(f"status={request.args.get('status')}")
-    if request.args.get('health_status'):
-        params.append(f"health_status={request.args.get('health_status')}")
-    if request.args.get('limit'):
-        params.append(f"limit={request.args.get('limit')}")
-    if request.args.get('offset'):
-        params.append(f"offset={request.args.get('offset')}")
-
-    query_string = '&'.join(params)
-    endpoint = f"/api/v1/sites?{query_string}" if query_string else "/api/v1/sites"
+    # Pass the filters through to the registry, skipping empty ones
+    args = request.args
+    filters = {name: value for name in SITE_LIST_FILTERS if (value := args.get(name))}
+    endpoint = f"/api/v1/sites?{urlencode(filters)}" if filters else "/api/v1/sites"
 
     result = _call_registry_api(endpoint)
+
+    # Optionally attach each site's health, fetched concurrently instead of one call per site from the client
+    if args.get('with_health') and result.get('success') and result.get('sites'):
+        # Rows without a slug have no health endpoint - they're returned without 'health'
+        sites = [site for site in result['sites'] if site.get('client_slug')]
+        health_results = _health_executor.map(
+            lambda site: _call_registry_api(f"/api/v1/sites/{quote(site['client_slug'], safe='')}/health"),
+            sites
+        )
+        for site, health in zip(sites, health_results):
+            site['health'] = health
+
     status_code = 200 if result.get('success') else 500
     return jsonify(result), status_code
 
@@ -839,7 +1122,7 @@ def get_site_details(client_slug):
     result = _call_registry_api(f"/api/v1/sites/{client_slug}")
 
     if result.get('success'):
-        return jsonify(result), 200
+        return _cacheable_json_response(result)
     else:
         status_code = 404 if 'not found' in result.get('error', '').lower() else 500
         return jsonify(result), status_code
@@ -900,7 +1183,7 @@ def get_site_health(client_slug):
     result = _call_registry_api(f"/api/v1/sites/{client_slug}/health")
 
     if result.get('success'):
-        return jsonify(result), 200
+        return _cacheable_json_response(result)
     else:
         status_code = 404 if 'not found' in result.get('error', '').lower() else 500
         return jsonify(result), status_code
@@ -919,6 +1202,44 @@ def check_site_health(client_slug):
 # ============================================================================
 
 
+PROVISIONING_TOPIC = 'darx-client-onboarding'
+_publisher = None
+_provisioning_topic_path = None
+_publisher_lock = threading.Lock()
+
+
+def _get_publisher() -> Tuple[Any, str]:
+    """
+    Get or create the shared Pub/Sub publisher and the provisioning topic path
+
+    Created on first publish - the gRPC channel setup is only paid by processes that
+    actually publish, and only once. Messages are batched for up to 50ms so bursts go
+    out in a single RPC.
+    """
+    global _publisher, _provisioning_topic_path
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                from google.cloud import pubsub_v1
+                publisher = pubsub_v1.PublisherClient(
+                    batch_settings=pubsub_v1.types.BatchSettings(
+                        max_messages=100,
+                        max_bytes=1_000_000,
+                        max_latency=0.05,
+                    )
+                )
+                _provisioning_topic_path = publisher.topic_path(PROJECT_ID, PROVISIONING_TOPIC)
+                _publisher = publisher
+    return _publisher, _provisioning_topic_path
+
+
+def _log_publish_result(future) -> None:
+    """Done-callback for publish futures - publishing is fire-and-forget, so failures are only logged"""
+    error = future.exception()
+    if error:
+        logger.warning("⚠️  Failed to publish provisioning message: %s", error)
+
+
 def _publish_provisioning_message(client_data: dict) -> None:
     """
     Publish a Pub/Sub message to trigger provisioner after site generation
@@ -934,15 +1255,7 @@ def _publish_provisioning_message(client_data: dict) -> None:
             - tier: Client tier (entry, premium, etc.)
     """
     try:
-        # Get GCP project configuration
-        gcp_project = os.getenv('GCP_PROJECT', 'sylvan-journey-474401-f9')
-        topic_name = 'darx-client-onboarding'
-
-        # Initialize Pub/Sub client
-        publisher = pubsub_v1.PublisherClient()
-        topic_path = publisher.topic_path(gcp_project, topic_name)
-
-        from datetime import datetime
+        publisher, topic_path = _get_publisher()
 
         # Build message payload
         message_data = {
@@ -955,35 +1268,25 @@ def _publish_provisioning_message(client_data: dict) -> None:
             'metadata': {
                 'initiatedBy': 'site-generator',
                 'onboardingSource': 'darx-generate-website-tool',
-                'requestedAt': datetime.utcnow().isoformat(),
+                'requestedAt': datetime.utcnow(),  # encoded as ISO 8601
                 'stagingUrl': client_data.get('staging_url'),
                 'githubRepo': client_data.get('github_repo')
             }
         }
 
         # Publish the message
-        message_json = json.dumps(message_data)
-        future = publisher.publish(topic_path, message_json.encode('utf-8'))
-        future.result()  # Block until publish completes
+        data, attributes = encode_pubsub_message(message_data)
+        future = publisher.publish(topic_path, data, **attributes)
+        # Don't wait on the publish - delivery is reported by the callback
+        future.add_done_callback(_log_publish_result)
 
-        print(f"   ✅ Published provisioning message for {client_data['client_slug']}")
+        logger.info("✅ Queued provisioning message for %s", client_data['client_slug'])
 
     except Exception as e:
-        print(f"   ⚠️  Failed to publish provisioning message: {str(e)}")
+        logger.warning("⚠️  Failed to publish provisioning message: %s", e)
         # Don't fail the entire generation if Pub/Sub fails
         # Provisioning can be triggered manually if needed
 
 
-def _cors_response():
-    """Handle CORS preflight requests"""
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Max-Age': '3600'
-    }
-    return ('', 204, headers)
-
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8080)))
@@ -6,14 +6,16 @@ Secure web form for collecting client information and Builder.io credentials.
 import os
 import secrets
 import hashlib
-import json
 import uuid
+import time
+import random
+import threading
 from datetime import datetime, timedelta
 from flask import Blueprint, request, render_template, jsonify, redirect, url_for
 from functools import wraps
-from google.cloud import pubsub_v1
 
 from .validation import validate_onboarding_form, sanitize_client_slug
+from darx.clients.gcp import encode_pubsub_message
 from auth import login_required
 
 # Create Blueprint
@@ -24,18 +26,67 @@ onboarding_bp = Blueprint('onboarding', __name__,
 # Token expiry time (24 hours)
 TOKEN_EXPIRY_HOURS = 24
 
+# Expired tokens are deleted in batches of this size
+TOKEN_CLEANUP_BATCH_SIZE = 1000
+
+# Pub/Sub topic that triggers the provisioner
+PUBSUB_PROJECT = os.getenv('GCP_PROJECT', 'sylvan-journey-474401-f9')
+ONBOARDING_TOPIC = 'darx-client-onboarding'
+
+# Shared Pub/Sub publisher (created on first publish)
+_publisher = None
+_onboarding_topic_path = None
+_publisher_lock = threading.Lock()
+
+# Slug availability results - a taken slug stays taken, so those are cached longer than
+# "available", which can change as soon as someone else submits the form
+SLUG_TAKEN_TTL = 30  # seconds
+SLUG_AVAILABLE_TTL = 5  # seconds
+SLUG_CACHE_JITTER = 5  # seconds, spreads out expiry of entries cached together
+SLUG_CACHE_MAX_SIZE = 1024
+_slug_cache = {}
+_slug_cache_lock = threading.Lock()
+
+# Shared Supabase client (created on first use)
+_supabase = None
+_supabase_lock = threading.Lock()
+
+
+def _get_supabase_client():
+    """
+    Get the shared Supabase client, or None if Supabase isn't configured
+
+    One client per process, so every query in a submission goes through the same
+    connection pool instead of each helper setting up its own.
+    """
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                from darx_core import get_supabase_client
+                _supabase = get_supabase_client()
+    return _supabase
+
 
 def get_supabase():
     """Get Supabase client for token storage"""
-    from darx_core import get_supabase_client
-
-    client = get_supabase_client()
+    client = _get_supabase_client()
     if not client:
         raise Exception("Supabase credentials not configured")
 
     return client
 
 
+def hash_token(token: str) -> str:
+    """
+    Hash an onboarding token for storage and lookup
+
+    Only the hash is kept in Supabase, so a database leak doesn't expose live links.
+    The token is already 32 random bytes, so a fast unsalted hash is enough.
+    """
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).hexdigest()
+
+
 def generate_onboarding_token(client_slug: str) -> str:
     """
     Generate a secure one-time token for onboarding and store in Supabase
@@ -52,9 +103,9 @@ def generate_onboarding_token(client_slug: str) -> str:
     try:
         supabase = get_supabase()
 
-        # Store token in Supabase with metadata
+        # Store token hash in Supabase with metadata
         supabase.table('onboarding_tokens').insert({
-            'token': token,
+            'token_hash': hash_token(token),
             'client_slug': client_slug,
             'created_at': datetime.utcnow().isoformat(),
             'used': False,
@@ -80,37 +131,52 @@ def validate_token(token: str) -> dict:
     try:
         supabase = get_supabase()
 
-        # Fetch token from Supabase
+        # Fetch the token only if it's unused and unexpired - Postgres applies both checks
         result = supabase.table('onboarding_tokens')\
-            .select('*')\
-            .eq('token', token)\
-            .single()\
+            .select('client_slug, created_at')\
+            .eq('token_hash', hash_token(token))\
+            .eq('used', False)\
+            .gt('expires_at', datetime.utcnow().isoformat())\
+            .limit(1)\
             .execute()
 
         if not result.data:
             return None
 
-        token_data = result.data
-
-        # Check if token has been used
-        if token_data['used']:
-            return None
-
-        # Check if token has expired
-        expires_at = datetime.fromisoformat(token_data['expires_at'].replace('Z', '+00:00'))
-        if datetime.utcnow().replace(tzinfo=None) > expires_at.replace(tzinfo=None):
-            return None
+        token_data = result.data[0]
 
         return {
             'client_slug': token_data['client_slug'],
             'created_at': datetime.fromisoformat(token_data['created_at'].replace('Z', '+00:00')),
-            'used': token_data['used']
+            'used': False
         }
     except Exception as e:
         print(f"Error validating token: {str(e)}")
         return None
 
 
+def _get_cached_slug_result(client_slug: str):
+    """Return the cached (is_available, error_message) for a slug, or None"""
+    with _slug_cache_lock:
+        cached = _slug_cache.get(client_slug)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def _cache_slug_result(client_slug: str, result: tuple) -> None:
+    """Remember a slug availability result for a jittered TTL"""
+    now = time.monotonic()
+    ttl = SLUG_AVAILABLE_TTL if result[0] else SLUG_TAKEN_TTL
+    with _slug_cache_lock:
+        if len(_slug_cache) >= SLUG_CACHE_MAX_SIZE:
+            # Drop expired entries, or everything if they're all still live
+            expired = [slug for slug, (expires, _) in _slug_cache.items() if expires <= now]
+            for slug in expired or list(_slug_cache):
+                del _slug_cache[slug]
+        _slug_cache[client_slug] = (now + ttl + random.uniform(0, SLUG_CACHE_JITTER), result)
+
+
 def check_slug_availability(client_slug: str) -> tuple:
     """
     Check if client slug is available (not already in use)
@@ -121,10 +187,12 @@ def check_slug_availability(client_slug: str) -> tuple:
     Returns:
         Tuple of (is_available: bool, error_message: str or None)
     """
-    try:
-        from darx_core import get_supabase_client
+    cached = _get_cached_slug_result(client_slug)
+    if cached is not None:
+        return cached
 
-        supabase = get_supabase_client()
+    try:
+        supabase = _get_supabase_client()
 
         if not supabase:
             # If Supabase not configured, allow it (dev mode)
@@ -143,10 +211,13 @@ def check_slug_availability(client_slug: str) -> tuple:
             existing_name = existing_client.get('client_name', 'Unknown')
             existing_status = existing_client.get('status', 'unknown')
 
-            return False, f"Client slug '{client_slug}' is already in use by '{existing_name}' (status: {existing_status}). Please choose a different slug."
+            availability = (False, f"Client slug '{client_slug}' is already in use by '{existing_name}' (status: {existing_status}). Please choose a different slug.")
+        else:
+            # Slug is available
+            availability = (True, None)
 
-        # Slug is available
-        return True, None
+        _cache_slug_result(client_slug, availability)
+        return availability
 
     except Exception as e:
         print(f"Error checking slug availability: {str(e)}")
@@ -273,31 +344,9 @@ def process_onboarding_form(token: str):
                                    errors=errors,
                                    form_data=form_data)
 
-        # Check slug uniqueness one more time (in case form was manually edited)
-        submitted_slug = form_data['client_slug']
-        slug_available, error_message = check_slug_availability(submitted_slug)
-
-        if not slug_available:
-            errors = [error_message]
-            return render_template('onboarding.html',
-                                   token=token,
-                                   client_slug=token_data['client_slug'],
-                                   csrf_token=generate_csrf_token(),
-                                   errors=errors,
-                                   form_data=form_data)
-
-        # Mark token as used in Supabase
-        try:
-            supabase = get_supabase()
-            supabase.table('onboarding_tokens')\
-                .update({'used': True})\
-                .eq('token', token)\
-                .execute()
-        except Exception as e:
-            print(f"Error marking token as used: {str(e)}")
-
-        # Store client data in Supabase
-        success, result = store_client_data(form_data)
+        # Consume the token, re-check slug uniqueness (in case form was manually edited)
+        # and create the client record - one transaction, one round trip
+        success, result = store_client_data(form_data, token)
 
         if not success:
             return render_template('onboarding.html',
@@ -322,6 +371,38 @@ def process_onboarding_form(token: str):
                                form_data=request.form)
 
 
+def _get_publisher() -> tuple:
+    """
+    Get the shared Pub/Sub publisher and the onboarding topic path
+
+    One client per process, so the gRPC channel is reused across submissions.
+    Messages are batched for up to 50ms before being sent. pubsub_v1 is only
+    imported here, so processes that never publish don't load it.
+    """
+    global _publisher, _onboarding_topic_path
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                from google.cloud import pubsub_v1
+                publisher = pubsub_v1.PublisherClient(
+                    batch_settings=pubsub_v1.types.BatchSettings(
+                        max_messages=100,
+                        max_bytes=1_000_000,
+                        max_latency=0.05,
+                    )
+                )
+                _onboarding_topic_path = publisher.topic_path(PUBSUB_PROJECT, ONBOARDING_TOPIC)
+                _publisher = publisher
+    return _publisher, _onboarding_topic_path
+
+
+def _log_publish_result(future) -> None:
+    """Done-callback for publish futures - log failures, since nothing waits on them"""
+    error = future.exception()
+    if error:
+        print(f"Warning: Failed to publish Pub/Sub message: {str(error)}")
+
+
 def publish_onboarding_message(form_data: dict, client_id: str) -> None:
     """
     Publish a Pub/Sub message to trigger the provisioner Cloud Function
@@ -330,13 +411,7 @@ def publish_onboarding_message(form_data: dict, client_id: str) -> None:
         form_data: Validated form data from the onboarding form
         client_id: Generated client ID from Supabase
     """
-    # Get GCP project configuration
-    gcp_project = os.getenv('GCP_PROJECT', 'sylvan-journey-474401-f9')
-    topic_name = 'darx-client-onboarding'
-
-    # Initialize Pub/Sub client and publisher
-    publisher = pubsub_v1.PublisherClient()
-    topic_path = publisher.topic_path(gcp_project, topic_name)
+    publisher, topic_path = _get_publisher()
 
     # Generate a client ID for the message (UUID v4)
     message_client_id = str(uuid.uuid4())
@@ -352,7 +427,7 @@ def publish_onboarding_message(form_data: dict, client_id: str) -> None:
         'metadata': {
             'initiatedBy': 'onboarding-form',
             'onboardingSource': 'admin-dashboard',
-            'requestedAt': datetime.utcnow().isoformat(),
+            'requestedAt': datetime.utcnow(),  # encoded as ISO 8601
             'supabaseClientId': client_id
         }
     }
@@ -366,26 +441,38 @@ def publish_onboarding_message(form_data: dict, client_id: str) -> None:
         }
 
     # Publish the message
-    message_json = json.dumps(message_data)
-    future = publisher.publish(topic_path, message_json.encode('utf-8'))
-    future.result()  # Block until publish completes
+    data, attributes = encode_pubsub_message(message_data)
+    future = publisher.publish(topic_path, data, **attributes)
+    # Fire-and-forget: the form response doesn't wait on the publish
+    future.add_done_callback(_log_publish_result)
 
 
-def store_client_data(form_data: dict) -> tuple:
+def _publish_in_background(form_data: dict, client_id: str) -> None:
+    """Publish the onboarding message, logging instead of raising - nothing waits on this"""
+    try:
+        publish_onboarding_message(form_data, client_id)
+        print(f"Queued onboarding message for client: {client_id}")
+    except Exception as pub_error:
+        print(f"Warning: Failed to publish Pub/Sub message: {str(pub_error)}")
+        # Don't fail the onboarding if Pub/Sub fails
+
+
+def store_client_data(form_data: dict, token: str) -> tuple:
     """
     Store client data in Supabase
 
+    Goes through the submit_onboarding function (migration 014), which marks the token
+    used, checks the slug is free and inserts the client in a single transaction.
+
     Args:
         form_data: Validated form data
+        token: Onboarding token being consumed
 
     Returns:
         Tuple of (success: bool, result_or_error: str)
     """
     try:
-        # Import Supabase client
-        from darx_core import get_supabase_client
-
-        supabase = get_supabase_client()
+        supabase = _get_supabase_client()
 
         if not supabase:
             print("Warning: Supabase credentials not configured")
@@ -433,23 +520,31 @@ def store_client_data(form_data: dict) -> tuple:
         # - SHARED mode: Copy values from darx-shared-builder-* template secrets
         # - DEDICATED mode: Use client's own Builder.io space credentials
 
-        # Insert into clients table
-        result = supabase.table('clients').insert(client_record).execute()
+        result = supabase.rpc('submit_onboarding', {
+            'p_token_hash': hash_token(token),
+            'p_record': client_record
+        }).execute()
+
+        outcome = result.data or {}
+        if outcome.get('status') == 'ok':
+            client_id = outcome['client_id']
 
-        if result.data:
-            client_id = result.data[0].get('id')
+            # The slug is taken now - don't serve a cached "available"
+            with _slug_cache_lock:
+                _slug_cache.pop(client_slug, None)
 
-            # Publish Pub/Sub message to trigger provisioner
-            try:
-                publish_onboarding_message(form_data, client_id)
-                print(f"Published onboarding message for client: {client_id}")
-            except Exception as pub_error:
-                print(f"Warning: Failed to publish Pub/Sub message: {str(pub_error)}")
-                # Don't fail the onboarding if Pub/Sub fails
+            # Trigger the provisioner off the request thread - the success page only
+            # needs the record, not the publish
+            threading.Thread(
+                target=_publish_in_background,
+                args=(form_data, client_id),
+                name='onboarding-publish',
+                daemon=True
+            ).start()
 
             return True, client_id
         else:
-            return False, "Failed to create client record"
+            return False, outcome.get('error') or "Failed to create client record"
 
     except Exception as e:
         print(f"Error storing client data: {str(e)}")
@@ -461,17 +556,21 @@ def store_client_data(form_data: dict) -> tuple:
 
 # Cleanup function for expired tokens (call periodically)
 def cleanup_expired_tokens():
-    """Remove expired tokens from Supabase"""
+    """Remove expired tokens from Supabase, TOKEN_CLEANUP_BATCH_SIZE rows at a time"""
     try:
         supabase = get_supabase()
-        now = datetime.utcnow().isoformat()
-
-        # Delete tokens that have expired
-        supabase.table('onboarding_tokens')\
-            .delete()\
-            .lt('expires_at', now)\
-            .execute()
-
-        print(f"Cleaned up expired onboarding tokens")
+        total_deleted = 0
+
+        # Each call deletes one bounded batch (migration 013) - repeat until none are left
+        while True:
+            result = supabase.rpc('cleanup_expired_onboarding_tokens', {
+                'batch_size': TOKEN_CLEANUP_BATCH_SIZE
+            }).execute()
+            deleted = result.data or 0
+            total_deleted += deleted
+            if deleted < TOKEN_CLEANUP_BATCH_SIZE:
+                break
+
+        print(f"Cleaned up {total_deleted} expired onboarding tokens")
     except Exception as e:
         print(f"Error cleaning up expired tokens: {str(e)}")
@@ -3,8 +3,67 @@ Form Validation for Client Onboarding
 """
 
 import re
+import string
 from typing import Dict, List, Tuple
 
+SLUG_RE = re.compile(r'^[a-z0-9][a-z0-9-]*[a-z0-9]$')
+LEGACY_PUBLIC_KEY_RE = re.compile(r'^[a-zA-Z0-9]+$')
+
+# sanitize_client_slug patterns
+SLUG_SEPARATOR_RE = re.compile(r'[\s_]+')
+SLUG_INVALID_CHARS_RE = re.compile(r'[^a-z0-9-]')
+SLUG_REPEATED_HYPHENS_RE = re.compile(r'-+')
+
+# Kept in display order for the error message
+VALID_WEBSITE_TYPES = ('marketing', 'ecommerce', 'documentation', 'portfolio', 'blog')
+VALID_WEBSITE_TYPE_SET = frozenset(VALID_WEBSITE_TYPES)
+INVALID_WEBSITE_TYPE_ERROR = f'Website Type must be one of: {", ".join(VALID_WEBSITE_TYPES)}'
+
+# Base required fields (always required)
+REQUIRED_FIELDS = (
+    ('client_name', 'Client Name'),
+    ('client_slug', 'Client Slug'),
+    ('contact_email', 'Contact Email'),
+    ('website_type', 'Website Type'),
+)
+
+# Builder.io credentials are only required for premium+ tiers
+PREMIUM_REQUIRED_FIELDS = REQUIRED_FIELDS + (
+    ('builder_public_key', 'Builder.io Public Key'),
+    ('builder_private_key', 'Builder.io Private Key'),
+)
+
+VALIDATED_FIELDS = tuple(field for field, _ in PREMIUM_REQUIRED_FIELDS)
+
+# Email validation - translate() with these tables deletes every allowed character,
+# so anything left over is invalid
+MAX_EMAIL_LENGTH = 254
+EMAIL_LOCAL_TABLE = str.maketrans('', '', string.ascii_letters + string.digits + '._%+-')
+EMAIL_DOMAIN_TABLE = str.maketrans('', '', string.ascii_letters + string.digits + '.-')
+EMAIL_TLD_TABLE = str.maketrans('', '', string.ascii_letters)
+
+
+def is_valid_email(email: str) -> bool:
+    """
+    Check an email address is in the form local@domain.tld
+
+    Single pass over the string with no regex, so there's no backtracking to exploit
+    with pathological input.
+    """
+    if len(email) > MAX_EMAIL_LENGTH:
+        return False
+
+    local, at, domain = email.partition('@')
+    if not at or not local or local.translate(EMAIL_LOCAL_TABLE):
+        return False
+
+    # The domain may not contain another '@' - translate catches that too
+    host, dot, tld = domain.rpartition('.')
+    if not dot or not host or domain.translate(EMAIL_DOMAIN_TABLE):
+        return False
+
+    return len(tld) >= 2 and not tld.translate(EMAIL_TLD_TABLE)
+
 
 def validate_onboarding_form(data: Dict) -> Tuple[bool, List[str]]:
     """
@@ -21,27 +80,18 @@ def validate_onboarding_form(data: Dict) -> Tuple[bool, List[str]]:
     # Get tier (default to entry if not specified)
     tier = data.get('tier', 'entry').strip()
 
-    # Base required fields (always required)
-    required_fields = {
-        'client_name': 'Client Name',
-        'client_slug': 'Client Slug',
-        'contact_email': 'Contact Email',
-        'website_type': 'Website Type',
-    }
-
-    # Builder.io credentials are only required for premium+ tiers
-    if tier != 'entry':
-        required_fields['builder_public_key'] = 'Builder.io Public Key'
-        required_fields['builder_private_key'] = 'Builder.io Private Key'
-
-    for field, label in required_fields.items():
-        if not data.get(field, '').strip():
+    # Strip each field once - everything below works on these values
+    values = {field: (data.get(field) or '').strip() for field in VALIDATED_FIELDS}
+
+    required_fields = REQUIRED_FIELDS if tier == 'entry' else PREMIUM_REQUIRED_FIELDS
+    for field, label in required_fields:
+        if not values[field]:
             errors.append(f'{label} is required')
 
     # Client slug validation
-    client_slug = data.get('client_slug', '')
+    client_slug = values['client_slug']
     if client_slug:
-        if not re.match(r'^[a-z0-9][a-z0-9-]*[a-z0-9]$', client_slug) and len(client_slug) > 2:
+        if not SLUG_RE.match(client_slug) and len(client_slug) > 2:
             errors.append('Client Slug must be lowercase, alphanumeric with hyphens only, and cannot start/end with a hyphen')
         elif len(client_slug) < 3:
             errors.append('Client Slug must be at least 3 characters')
@@ -49,31 +99,28 @@ def validate_onboarding_form(data: Dict) -> Tuple[bool, List[str]]:
             errors.append('Client Slug must be 30 characters or less')
 
     # Email validation
-    contact_email = data.get('contact_email', '')
-    if contact_email:
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, contact_email):
-            errors.append('Please enter a valid email address')
+    contact_email = values['contact_email']
+    if contact_email and not is_valid_email(contact_email):
+        errors.append('Please enter a valid email address')
 
     # Website type validation
-    valid_website_types = ['marketing', 'ecommerce', 'documentation', 'portfolio', 'blog']
-    website_type = data.get('website_type', '')
-    if website_type and website_type not in valid_website_types:
-        errors.append(f'Website Type must be one of: {", ".join(valid_website_types)}')
+    website_type = values['website_type']
+    if website_type and website_type not in VALID_WEBSITE_TYPE_SET:
+        errors.append(INVALID_WEBSITE_TYPE_ERROR)
 
     # Builder.io public key validation (accept both legacy and new formats)
-    builder_public_key = data.get('builder_public_key', '')
+    builder_public_key = values['builder_public_key']
     if builder_public_key:
         # Accept both legacy keys (alphanumeric) and new keys (pub-*)
         # Legacy keys are typically 32-40 characters, new keys start with "pub-"
         if len(builder_public_key) < 20:
             errors.append('Builder.io Public Key appears to be invalid (too short)')
         # Validate format: either starts with "pub-" or is alphanumeric (legacy)
-        elif not (builder_public_key.startswith('pub-') or re.match(r'^[a-zA-Z0-9]+$', builder_public_key)):
+        elif not (builder_public_key.startswith('pub-') or LEGACY_PUBLIC_KEY_RE.match(builder_public_key)):
             errors.append('Builder.io Public Key must be either a legacy key (alphanumeric) or start with "pub-"')
 
     # Builder.io private key validation
-    builder_private_key = data.get('builder_private_key', '')
+    builder_private_key = values['builder_private_key']
     if builder_private_key:
         if len(builder_private_key) < 20:
             errors.append('Builder.io Private Key appears to be invalid (too short)')
@@ -95,13 +142,13 @@ def sanitize_client_slug(slug: str) -> str:
     slug = slug.lower().strip()
 
     # Replace spaces and underscores with hyphens
-    slug = re.sub(r'[\s_]+', '-', slug)
+    slug = SLUG_SEPARATOR_RE.sub('-', slug)
 
     # Remove any non-alphanumeric characters (except hyphens)
-    slug = re.sub(r'[^a-z0-9-]', '', slug)
+    slug = SLUG_INVALID_CHARS_RE.sub('', slug)
 
     # Remove consecutive hyphens
-    slug = re.sub(r'-+', '-', slug)
+    slug = SLUG_REPEATED_HYPHENS_RE.sub('-', slug)
 
     # Remove leading/trailing hyphens
     slug = slug.strip('-')
@@ -0,0 +1,88 @@
+-- Migration: 012_create_submit_onboarding.sql
+-- Description: Submit an onboarding form in a single round trip
+-- Created: 2026-10-15
+
+-- Function: submit_onboarding
+-- Consumes the onboarding token and creates the client record in one transaction.
+-- The token row is locked, so two submissions of the same link can't both succeed,
+-- and the slug check and insert can't race each other.
+--
+-- Returns: {"status": "ok", "client_id": "..."}
+--       or {"status": "invalid_token" | "slug_taken", "error": "..."}
+CREATE OR REPLACE FUNCTION submit_onboarding(
+    p_token TEXT,
+    p_record JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    token_row onboarding_tokens%ROWTYPE;
+    existing clients%ROWTYPE;
+    new_client_id UUID;
+BEGIN
+    SELECT * INTO token_row
+    FROM onboarding_tokens
+    WHERE token = p_token
+    FOR UPDATE;
+
+    IF NOT FOUND OR token_row.used OR token_row.expires_at < NOW() THEN
+        RETURN jsonb_build_object(
+            'status', 'invalid_token',
+            'error', 'This onboarding link is invalid or has expired'
+        );
+    END IF;
+
+    SELECT * INTO existing
+    FROM clients
+    WHERE client_slug = p_record->>'client_slug';
+
+    IF FOUND THEN
+        RETURN jsonb_build_object(
+            'status', 'slug_taken',
+            'error', format(
+                'Client slug ''%s'' is already in use by ''%s'' (status: %s). Please choose a different slug.',
+                existing.client_slug, existing.client_name, existing.status
+            )
+        );
+    END IF;
+
+    UPDATE onboarding_tokens
+    SET used = TRUE, used_at = NOW()
+    WHERE id = token_row.id;
+
+    INSERT INTO clients (
+        client_name,
+        client_slug,
+        contact_email,
+        industry,
+        builder_space_tier,
+        builder_space_mode,
+        gcp_project_id,
+        status,
+        website_type,
+        builder_public_key,
+        builder_private_key,
+        builder_space_id
+    )
+    SELECT
+        r.client_name,
+        r.client_slug,
+        r.contact_email,
+        r.industry,
+        r.builder_space_tier,
+        r.builder_space_mode,
+        r.gcp_project_id,
+        r.status,
+        r.website_type,
+        r.builder_public_key,
+        r.builder_private_key,
+        r.builder_space_id
+    FROM jsonb_populate_record(NULL::clients, p_record) AS r
+    RETURNING id INTO new_client_id;
+
+    RETURN jsonb_build_object('status', 'ok', 'client_id', new_client_id);
+END;
+$$;
+
+COMMENT ON FUNCTION submit_onboarding IS 'Atomically consume an onboarding token and create the client record';
@@ -0,0 +1,33 @@
+-- Migration: 013_batch_token_cleanup.sql
+-- Description: Delete expired onboarding tokens in bounded batches
+-- Created: 2026-10-15
+
+-- The original cleanup deleted every expired token in one statement. Replace it with a
+-- version that deletes at most batch_size rows per call and returns how many it removed,
+-- so callers can loop until it returns 0 without holding locks on the whole backlog.
+-- The expires_at predicate is served by idx_onboarding_tokens_expires_at (migration 004).
+DROP FUNCTION IF EXISTS cleanup_expired_onboarding_tokens();
+
+CREATE OR REPLACE FUNCTION cleanup_expired_onboarding_tokens(
+    batch_size INTEGER DEFAULT 1000
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted_count INTEGER;
+BEGIN
+    DELETE FROM onboarding_tokens
+    WHERE id IN (
+        SELECT id
+        FROM onboarding_tokens
+        WHERE expires_at < NOW()
+        LIMIT batch_size
+    );
+
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+    RETURN deleted_count;
+END;
+$$;
+
+COMMENT ON FUNCTION cleanup_expired_onboarding_tokens IS 'Delete up to batch_size expired onboarding tokens, returning the number deleted';
@@ -0,0 +1,97 @@
+-- Migration: 014_hash_onboarding_tokens.sql
+-- Description: Store onboarding tokens as BLAKE2b hashes instead of raw values
+-- Created: 2026-10-15
+
+-- The app now stores hashlib.blake2b(token, digest_size=16).hexdigest() in token_hash
+-- and looks tokens up by that hash, so a database leak no longer exposes live links.
+-- New tokens leave the raw token column empty. Links issued before this migration
+-- can't be matched by hash and need to be reissued (they expire within 24h anyway).
+ALTER TABLE onboarding_tokens
+ALTER COLUMN token DROP NOT NULL,
+ADD COLUMN IF NOT EXISTS token_hash TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_onboarding_tokens_token_hash ON onboarding_tokens(token_hash);
+
+COMMENT ON COLUMN onboarding_tokens.token IS 'Deprecated - raw token, only set on rows created before token hashing';
+COMMENT ON COLUMN onboarding_tokens.token_hash IS 'BLAKE2b-128 hex digest of the onboarding token';
+
+-- submit_onboarding now takes the token hash
+DROP FUNCTION IF EXISTS submit_onboarding(TEXT, JSONB);
+
+CREATE OR REPLACE FUNCTION submit_onboarding(
+    p_token_hash TEXT,
+    p_record JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    token_row onboarding_tokens%ROWTYPE;
+    existing clients%ROWTYPE;
+    new_client_id UUID;
+BEGIN
+    SELECT * INTO token_row
+    FROM onboarding_tokens
+    WHERE token_hash = p_token_hash
+    FOR UPDATE;
+
+    IF NOT FOUND OR token_row.used OR token_row.expires_at < NOW() THEN
+        RETURN jsonb_build_object(
+            'status', 'invalid_token',
+            'error', 'This onboarding link is invalid or has expired'
+        );
+    END IF;
+
+    SELECT * INTO existing
+    FROM clients
+    WHERE client_slug = p_record->>'client_slug';
+
+    IF FOUND THEN
+        RETURN jsonb_build_object(
+            'status', 'slug_taken',
+            'error', format(
+                'Client slug ''%s'' is already in use by ''%s'' (status: %s). Please choose a different slug.',
+                existing.client_slug, existing.client_name, existing.status
+            )
+        );
+    END IF;
+
+    UPDATE onboarding_tokens
+    SET used = TRUE, used_at = NOW()
+    WHERE id = token_row.id;
+
+    INSERT INTO clients (
+        client_name,
+        client_slug,
+        contact_email,
+        industry,
+        builder_space_tier,
+        builder_space_mode,
+        gcp_project_id,
+        status,
+        website_type,
+        builder_public_key,
+        builder_private_key,
+        builder_space_id
+    )
+    SELECT
+        r.client_name,
+        r.client_slug,
+        r.contact_email,
+        r.industry,
+        r.builder_space_tier,
+        r.builder_space_mode,
+        r.gcp_project_id,
+        r.status,
+        r.website_type,
+        r.builder_public_key,
+        r.builder_private_key,
+        r.builder_space_id
+    FROM jsonb_populate_record(NULL::clients, p_record) AS r
+    RETURNING id INTO new_client_id;
+
+    RETURN jsonb_build_object('status', 'ok', 'client_id', new_client_id);
+END;
+$$;
+
+COMMENT ON FUNCTION submit_onboarding IS 'Atomically consume an onboarding token and create the client record';
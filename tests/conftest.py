@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app modules (main, onboarding, darx) from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeQuery:
+    """Records a supabase-py query chain and returns the next canned result on execute()"""
+
+    def __init__(self, supabase, target):
+        self.supabase = supabase
+        self.target = target
+        self.calls = []
+
+    def __getattr__(self, method):
+        def record(*args):
+            self.calls.append((method, args))
+            return self
+        return record
+
+    def execute(self):
+        self.supabase.queries.append((self.target, self.calls))
+        return type('APIResponse', (), {'data': self.supabase.results[self.target].pop(0)})()
+
+
+class FakeSupabase:
+    """Stand-in for the Supabase client - results maps a table or RPC name to the data of successive calls"""
+
+    def __init__(self):
+        self.results = {}
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        query = FakeQuery(self, name)
+        query.calls.append(('rpc', (params,)))
+        return query
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase()
@@ -0,0 +1,34 @@
+import gzip
+import json
+from datetime import datetime
+
+from darx.clients import gcp
+
+MESSAGE = {'clientSlug': 'acme-bakery', 'metadata': {'requestedAt': datetime(2026, 10, 15, 12, 30), 'notes': 'x' * 1000}}
+
+
+def test_pubsub_messages_are_plain_json_by_default(monkeypatch):
+    monkeypatch.setattr(gcp, 'PUBSUB_COMPRESSION', False)
+
+    data, attributes = gcp.encode_pubsub_message(MESSAGE)
+
+    assert attributes == {}
+    assert json.loads(data)['metadata']['requestedAt'] == '2026-10-15T12:30:00'
+
+
+def test_large_pubsub_messages_are_gzipped_when_enabled(monkeypatch):
+    monkeypatch.setattr(gcp, 'PUBSUB_COMPRESSION', True)
+
+    data, attributes = gcp.encode_pubsub_message(MESSAGE)
+
+    assert attributes == {'codec': 'gzip'}
+    assert json.loads(gzip.decompress(data))['clientSlug'] == 'acme-bakery'
+
+
+def test_small_pubsub_messages_are_not_compressed(monkeypatch):
+    monkeypatch.setattr(gcp, 'PUBSUB_COMPRESSION', True)
+
+    data, attributes = gcp.encode_pubsub_message({'clientSlug': 'acme-bakery'})
+
+    assert attributes == {}
+    assert json.loads(data) == {'clientSlug': 'acme-bakery'}
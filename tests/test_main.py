@@ -0,0 +1,156 @@
+import threading
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import msgspec
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_generate_request_nulls_fall_back_to_defaults():
+    generate_request = msgspec.json.decode(
+        b'{"project_name": "acme", "requirements": "A bakery site", "client_info": null,'
+        b' "industry": null, "features": null, "mode": null, "secret_prefix": null}',
+        type=main.GenerateRequest,
+    )
+
+    assert generate_request.client_info == {}
+    assert generate_request.industry == 'general'
+    assert generate_request.features == []
+    assert generate_request.mode == 'DEDICATED'
+    assert generate_request.secret_prefix == ''
+
+
+def test_generate_request_still_requires_project_name():
+    with pytest.raises(msgspec.ValidationError):
+        msgspec.json.decode(b'{"project_name": null, "requirements": "x"}', type=main.GenerateRequest)
+
+
+def test_edit_endpoint_accepts_null_changes(client, monkeypatch):
+    calls = []
+
+    def fake_edit_site(**kwargs):
+        calls.append(kwargs)
+        return {'success': True, 'files_updated': []}
+
+    monkeypatch.setattr(main, 'edit_site', fake_edit_site)
+
+    response = client.post('/edit', data=b'{"project_name": "acme", "edit_type": "color_palette", "changes": null}')
+
+    assert response.status_code == 200
+    assert calls[0]['changes'] == {}
+
+
+def test_jsonify_sorts_keys_like_flask():
+    with main.app.app_context():
+        response = main.jsonify({'b': 1, 'a': {'d': 2, 'c': 3}})
+
+    assert response.get_data() == b'{"a":{"c":3,"d":2},"b":1}\n'
+
+
+def test_json_provider_keeps_flask_type_handling():
+    provider = main.app.json
+    payload = {
+        'created_at': datetime(2026, 10, 15, 12, 30, tzinfo=timezone.utc),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'price': Decimal('9.99'),
+    }
+
+    assert provider.dumps(payload) == DefaultJSONProvider(main.app).dumps(payload, separators=(',', ':'))
+    assert '"Thu, 15 Oct 2026 12:30:00 GMT"' in provider.dumps(payload)
+
+
+def test_json_provider_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        main.app.json.dumps({'value': object()})
+
+
+def test_json_provider_honors_sort_keys_argument():
+    assert main.app.json.dumps({'b': 1, 'a': 2}, sort_keys=False) == '{"b":1,"a":2}'
+
+
+def test_list_sites_probes_health_on_its_own_pool(client, monkeypatch):
+    calls = []
+
+    def fake_registry(endpoint, method='GET', data=None):
+        calls.append((endpoint, threading.current_thread().name))
+        if endpoint.startswith('/api/v1/sites?'):
+            return {'success': True, 'sites': [{'client_slug': 'acme co'}, {'client_slug': None}]}
+        return {'success': True, 'status': 'healthy'}
+
+    monkeypatch.setattr(main, '_call_registry_api', fake_registry)
+
+    response = client.get('/sites?with_health=1&status=active&limit=')
+
+    sites = response.get_json()['sites']
+    assert calls[0][0] == '/api/v1/sites?status=active'
+    assert calls[1][0] == '/api/v1/sites/acme%20co/health'
+    assert calls[1][1].startswith('site-health')
+    assert sites[0]['health'] == {'success': True, 'status': 'healthy'}
+    assert 'health' not in sites[1]
+
+
+def test_only_active_clients_are_cached(client, monkeypatch, fake_supabase):
+    fake_supabase.results['clients'] = [[{'client_slug': 'acme', 'status': 'pending_provisioning'}]] * 2
+    monkeypatch.setattr(main, 'get_supabase_client', lambda: fake_supabase)
+    monkeypatch.setattr(main, '_active_clients_cache', {})
+    body = b'{"project_name": "acme", "requirements": "A bakery site"}'
+
+    responses = [client.post('/', data=body) for _ in range(2)]
+
+    assert [r.get_json()['error'] for r in responses] == ['Client not ready for site generation'] * 2
+    assert len(fake_supabase.queries) == 2
+    assert main._get_cached_active_client('acme') is None
+
+
+def test_active_client_cache_expires(monkeypatch):
+    monkeypatch.setattr(main, '_active_clients_cache', {})
+    record = {'client_slug': 'acme', 'status': 'active'}
+
+    main._cache_active_client('acme', record)
+    assert main._get_cached_active_client('acme') == record
+
+    monkeypatch.setattr(main, 'CLIENT_STATUS_TTL', 0)
+    main._cache_active_client('acme', record)
+    assert main._get_cached_active_client('acme') is None
+
+
+def test_site_details_revalidate_with_etag(client, monkeypatch):
+    monkeypatch.setattr(main, '_call_registry_api', lambda endpoint: {'success': True, 'site': {'client_slug': 'acme'}})
+
+    first = client.get('/sites/acme')
+    second = client.get('/sites/acme', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == main.SITE_CACHE_CONTROL
+    assert second.status_code == 304
+    assert second.get_data() == b''
+
+
+def test_generation_endpoints_answer_cors_preflight(client):
+    response = client.options('/edit', headers={
+        'Origin': 'https://dashboard.example',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'Content-Type',
+    })
+
+    assert response.status_code == 200
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+    assert 'POST' in response.headers['Access-Control-Allow-Methods']
+    assert response.headers['Access-Control-Max-Age'] == '86400'
+
+
+def test_other_routes_get_no_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(main, '_call_registry_api', lambda endpoint: {'success': True, 'site': {}})
+
+    response = client.get('/sites/acme', headers={'Origin': 'https://dashboard.example'})
+
+    assert 'Access-Control-Allow-Origin' not in response.headers
@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+
+import pytest
+
+from onboarding import form
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'supabase_migrations')
+
+FORM_DATA = {
+    'client_name': 'Acme Bakery',
+    'client_slug': 'acme-bakery',
+    'contact_email': 'owner@acme.example',
+    'website_type': 'marketing',
+    'tier': 'entry',
+    'industry': 'food',
+}
+
+
+def _latest_function_definition(name):
+    """Source of the last migration that (re)creates a SQL function"""
+    for filename in sorted(os.listdir(MIGRATIONS_DIR), reverse=True):
+        with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+            sql = f.read()
+        match = re.search(rf'CREATE OR REPLACE FUNCTION {name}\((.*?)\)\s*RETURNS(.*?)\$\$;', sql, re.DOTALL)
+        if match:
+            return match
+    raise AssertionError(f"No migration defines {name}")
+
+
+@pytest.fixture
+def supabase(monkeypatch, fake_supabase):
+    monkeypatch.setattr(form, '_supabase', fake_supabase)
+    monkeypatch.setattr(form, '_slug_cache', {})
+    return fake_supabase
+
+
+@pytest.fixture
+def published(monkeypatch):
+    published = []
+    monkeypatch.setattr(form, '_publish_in_background', lambda *args: published.append(args))
+    return published
+
+
+def test_store_client_data_matches_submit_onboarding_signature(supabase, published):
+    supabase.results['submit_onboarding'] = [{'status': 'ok', 'client_id': 'client-1'}]
+
+    assert form.store_client_data(dict(FORM_DATA), 'token-value') == (True, 'client-1')
+
+    (target, calls), = supabase.queries
+    params = calls[0][1][0]
+    definition = _latest_function_definition('submit_onboarding')
+    arguments = re.findall(r'(\w+)\s+[A-Z]+', definition.group(1))
+    record_columns = set(re.findall(r'\br\.(\w+)', definition.group(2)))
+
+    assert target == 'submit_onboarding'
+    assert list(params) == arguments
+    assert set(params['p_record']) == record_columns
+    assert params['p_record']['builder_space_mode'] == 'SHARED'
+
+
+def test_store_client_data_publishes_after_the_record_is_stored(supabase, published):
+    supabase.results['submit_onboarding'] = [{'status': 'ok', 'client_id': 'client-1'}]
+    form._cache_slug_result('acme-bakery', (True, None))
+
+    form.store_client_data(dict(FORM_DATA), 'token-value')
+    for thread in threading.enumerate():
+        if thread.name == 'onboarding-publish':
+            thread.join(timeout=5)
+
+    assert published == [(FORM_DATA, 'client-1')]
+    assert form._get_cached_slug_result('acme-bakery') is None
+
+
+def test_store_client_data_reports_rpc_errors_without_publishing(supabase, published):
+    supabase.results['submit_onboarding'] = [{'status': 'slug_taken', 'error': "Client slug 'acme-bakery' is already in use"}]
+
+    assert form.store_client_data(dict(FORM_DATA), 'token-value') == (False, "Client slug 'acme-bakery' is already in use")
+    assert published == []
+
+
+def test_taken_slugs_are_cached(supabase):
+    supabase.results['clients'] = [[{'client_slug': 'acme-bakery', 'client_name': 'Acme', 'status': 'active'}]]
+
+    first = form.check_slug_availability('acme-bakery')
+    second = form.check_slug_availability('acme-bakery')
+
+    assert first == second
+    assert first[0] is False
+    assert len(supabase.queries) == 1
+
+
+def test_available_slugs_expire_sooner(supabase, monkeypatch):
+    monkeypatch.setattr(form, 'SLUG_AVAILABLE_TTL', 0)
+    monkeypatch.setattr(form, 'SLUG_CACHE_JITTER', 0)
+    supabase.results['clients'] = [[], []]
+
+    assert form.check_slug_availability('acme-bakery') == (True, None)
+    assert form.check_slug_availability('acme-bakery') == (True, None)
+    assert len(supabase.queries) == 2
+
+
+def test_slug_cache_is_bounded(supabase, monkeypatch):
+    monkeypatch.setattr(form, 'SLUG_CACHE_MAX_SIZE', 3)
+
+    for i in range(10):
+        form._cache_slug_result(f'slug-{i}', (True, None))
+
+    assert len(form._slug_cache) <= 3
+    assert form._get_cached_slug_result('slug-9') == (True, None)
+
+
+def test_cleanup_expired_tokens_repeats_until_a_partial_batch(supabase, monkeypatch):
+    monkeypatch.setattr(form, 'TOKEN_CLEANUP_BATCH_SIZE', 2)
+    supabase.results['cleanup_expired_onboarding_tokens'] = [2, 2, 1]
+
+    form.cleanup_expired_tokens()
+
+    definition = _latest_function_definition('cleanup_expired_onboarding_tokens')
+    assert [target for target, _ in supabase.queries] == ['cleanup_expired_onboarding_tokens'] * 3
+    assert all(calls[0][1][0] == {'batch_size': 2} for _, calls in supabase.queries)
+    assert re.match(r'\s*batch_size INTEGER', definition.group(1))
+    assert 'RETURNS INTEGER' in definition.group(0)
+
+
+def test_only_the_token_hash_is_stored(supabase):
+    supabase.results['onboarding_tokens'] = [None]
+
+    token = form.generate_onboarding_token('acme-bakery')
+
+    (target, calls), = supabase.queries
+    row = calls[0][1][0]
+    assert target == 'onboarding_tokens'
+    assert row['token_hash'] == form.hash_token(token)
+    assert 'token' not in row
+    assert token not in row.values()
+
+
+def test_hash_token_is_stable_and_distinct():
+    assert form.hash_token('token-a') == form.hash_token('token-a')
+    assert form.hash_token('token-a') != form.hash_token('token-b')
+    assert re.fullmatch(r'[0-9a-f]{32}', form.hash_token('token-a'))
+
+
+def test_validate_token_filters_used_and_expired_tokens_in_the_query(supabase):
+    supabase.results['onboarding_tokens'] = [[{'client_slug': 'acme-bakery', 'created_at': '2026-10-15T12:30:00Z'}], []]
+
+    token_data = form.validate_token('token-value')
+    missing = form.validate_token('unknown-token')
+
+    filters = [(method, args[0]) for method, args in supabase.queries[0][1] if method in ('eq', 'gt')]
+    assert filters == [('eq', 'token_hash'), ('eq', 'used'), ('gt', 'expires_at')]
+    assert ('eq', ('token_hash', form.hash_token('token-value'))) in supabase.queries[0][1]
+    assert token_data['client_slug'] == 'acme-bakery'
+    assert missing is None
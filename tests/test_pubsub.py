@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_does_not_load_pubsub():
+    # Fresh interpreter, so modules imported by other tests don't count
+    code = "import sys, main; sys.exit('google.cloud.pubsub_v1' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, timeout=120)
+    assert result.returncode == 0, result.stderr.decode()
@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from onboarding.validation import is_valid_email, validate_onboarding_form
+
+# The pattern is_valid_email replaced
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+VALID_FORM = {
+    'client_name': 'Acme Bakery',
+    'client_slug': 'acme-bakery',
+    'contact_email': 'owner@acme.example',
+    'website_type': 'marketing',
+    'tier': 'entry',
+}
+
+
+@pytest.mark.parametrize('email', [
+    'owner@acme.example',
+    'first.last+tag@sub.acme.co.uk',
+    'a_b%c-d@x-y.io',
+    'o@a.b.c.de',
+    'owner@acme',
+    'owner@acme.c',
+    'owner@acme.c0m',
+    'owner@@acme.com',
+    'owner@acme@example.com',
+    '@acme.com',
+    'owner@.com',
+    'owner@acme.',
+    'own er@acme.com',
+    'owner@acmé.com',
+    'owner',
+    '',
+])
+def test_is_valid_email_matches_the_old_pattern(email):
+    assert is_valid_email(email) == bool(EMAIL_RE.fullmatch(email))
+
+
+def test_is_valid_email_rejects_overlong_addresses():
+    assert not is_valid_email('a' * 250 + '@acme.com')
+
+
+def test_validate_onboarding_form_strips_fields():
+    form_data = {field: f'  {value}  ' for field, value in VALID_FORM.items()}
+
+    assert validate_onboarding_form(form_data) == (True, [])
+
+
+def test_validate_onboarding_form_requires_builder_keys_for_premium():
+    is_valid, errors = validate_onboarding_form({**VALID_FORM, 'tier': 'premium', 'builder_public_key': '   '})
+
+    assert not is_valid
+    assert errors == ['Builder.io Public Key is required', 'Builder.io Private Key is required']
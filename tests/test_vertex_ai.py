@@ -0,0 +1,248 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from darx.clients import vertex_ai
+
+
+@pytest.fixture
+def two_slots(monkeypatch):
+    """Run with DARX_MAX_CONCURRENT=2"""
+    monkeypatch.setattr(vertex_ai, 'MAX_CONCURRENT_GENERATIONS', 2)
+    monkeypatch.setattr(vertex_ai, '_generation_slots', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(vertex_ai, '_slot_waiters', ThreadPoolExecutor(max_workers=2))
+
+
+def test_generation_slot_batch_larger_than_default_executor(two_slots):
+    # More jobs than the loop's default executor has threads, each resolving a host
+    # (on the default executor) while holding a slot - must finish, not deadlock
+    jobs = min(32, (os.cpu_count() or 1) + 4) + 5
+    active = 0
+    peak = 0
+
+    async def job():
+        nonlocal active, peak
+        async with vertex_ai._generation_slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.get_running_loop().getaddrinfo('localhost', 80)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def batch():
+        await asyncio.gather(*(job() for _ in range(jobs)))
+
+    # A daemon thread, so a deadlocked batch fails the test instead of hanging the run
+    runner = threading.Thread(target=asyncio.run, args=(batch(),), daemon=True)
+    runner.start()
+    runner.join(timeout=30)
+
+    assert not runner.is_alive(), "batch deadlocked"
+    assert peak == 2
+
+
+def test_generation_slot_limit_is_shared_across_event_loops(two_slots):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    async def job():
+        nonlocal active, peak
+        async with vertex_ai._generation_slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            with lock:
+                active -= 1
+
+    async def batch():
+        await asyncio.gather(*(job() for _ in range(4)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(batch(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert peak == 2
+
+
+def test_generation_slot_released_when_waiter_is_cancelled(two_slots):
+    slots = vertex_ai._generation_slots
+
+    async def scenario():
+        slots.acquire()
+        slots.acquire()
+
+        async def waiter():
+            async with vertex_ai._generation_slot():
+                pass
+
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        slots.release()
+        slots.release()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert [slots.acquire(blocking=False) for _ in range(3)] == [True, True, False]
+
+
+def test_get_prompt_is_plain_text_blocks():
+    blocks = vertex_ai.get_prompt('saas', ['stripe-checkout', 'not-a-prompt-feature'])
+
+    assert blocks[0]['text'] == vertex_ai.BASE_SYSTEM_PROMPT
+    assert 'STRIPE' in blocks[1]['text']
+    assert all(set(block) == {'type', 'text'} for block in blocks)
+
+
+def test_get_prompt_without_instructions_is_base_prompt_only():
+    assert vertex_ai.get_prompt('unknown-industry', []) == [
+        {'type': 'text', 'text': vertex_ai.BASE_SYSTEM_PROMPT}
+    ]
+
+
+class FakeMessage:
+    def __init__(self, text, stop_reason='end_turn'):
+        self.content = [type('Block', (), {'text': text})()]
+        self.stop_reason = stop_reason
+
+
+class FakeStream:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def __enter__(self):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def get_final_message(self):
+        return self.outcome
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeAsyncStream(FakeStream):
+    async def get_final_message(self):
+        return self.outcome
+
+
+class FakeClient:
+    """Plays back one outcome (a message or an exception) per request"""
+
+    def __init__(self, outcomes, stream_class=FakeStream):
+        self.outcomes = list(outcomes)
+        self.stream_class = stream_class
+        self.requests = []
+        self.messages = self
+
+    def with_options(self, **options):
+        return self
+
+    def stream(self, **message_params):
+        self.requests.append(message_params)
+        return self.stream_class(self.outcomes.pop(0))
+
+
+def _rate_limit_error():
+    from anthropic import RateLimitError
+
+    request = httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+    return RateLimitError('rate limited', response=httpx.Response(429, request=request), body=None)
+
+
+def _truncated_generation():
+    """A 429, then a response cut off after app/layout.tsx, then the continuation with the rest"""
+    return [
+        _rate_limit_error(),
+        FakeMessage('{"files": [{"path": "app/layout.tsx", "content": "layout"}, {"path": "pack', 'max_tokens'),
+        FakeMessage(
+            '{"files": [{"path": "package.json", "content": "{}"},'
+            ' {"path": "app/globals.css", "content": "@tailwind base;"}]}'
+        ),
+    ]
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(vertex_ai, 'RETRY_BASE_DELAY', 0.0)
+    monkeypatch.setattr(vertex_ai, 'GENERATION_CACHE_DIR', None)
+
+
+def test_sync_and_async_generation_share_the_pipeline(monkeypatch, no_retry_delay):
+    sync_client = FakeClient(_truncated_generation())
+    async_client = FakeClient(_truncated_generation(), FakeAsyncStream)
+    monkeypatch.setattr(vertex_ai, 'get_client', lambda: sync_client)
+    monkeypatch.setattr(vertex_ai, 'get_async_client', lambda: async_client)
+
+    sync_result = vertex_ai.generate_site_code('acme', 'A bakery site')
+    async_result = asyncio.run(vertex_ai.generate_site_code_async('acme', 'A bakery site'))
+
+    assert sync_result['success'] is True
+    assert sync_result == async_result
+    assert {'app/layout.tsx', 'package.json'} <= {f['path'] for f in sync_result['files']}
+    assert sync_client.requests == async_client.requests
+    assert len(sync_client.requests) == 3
+    assert sync_client.requests[2]['max_tokens'] == vertex_ai.CONTINUATION_OUTPUT_TOKENS
+
+
+def test_generation_does_not_retry_non_transient_errors(monkeypatch, no_retry_delay):
+    client = FakeClient([ValueError('bad request')])
+    monkeypatch.setattr(vertex_ai, 'get_client', lambda: client)
+
+    result = vertex_ai.generate_site_code('acme', 'A bakery site')
+
+    assert result == {'success': False, 'error': 'bad request'}
+    assert len(client.requests) == 1
+
+
+def test_generated_globals_css_is_kept():
+    generated = [
+        {'path': 'app/layout.tsx', 'content': 'layout'},
+        {'path': 'app/globals.css', 'content': '@tailwind base;\nbody { font-family: serif; }'},
+        {'path': 'package.json', 'content': '{}'},
+    ]
+
+    result = vertex_ai._build_result(generated)
+
+    assert 'app/globals.css' not in vertex_ai.STATIC_FILES
+    assert {'path': 'app/globals.css', 'content': '@tailwind base;\nbody { font-family: serif; }'} in result['files']
+
+
+def test_missing_globals_css_is_reported():
+    with pytest.raises(Exception, match='app/globals.css'):
+        vertex_ai._build_result([
+            {'path': 'app/layout.tsx', 'content': 'layout'},
+            {'path': 'package.json', 'content': '{}'},
+        ])
+
+
+@pytest.mark.parametrize('response_text', [
+    '{"files": [{"path": "a.tsx", "content": "b"}]}',
+    '```json\n{"files": [{"path": "a.tsx", "content": "b"}]}\n```',
+    '{"files": [{"path": "a.tsx", "content": "b"}, {"path": "c.tsx", "con',
+])
+def test_parse_response_handles_fences_and_truncation(response_text):
+    assert vertex_ai._parse_response(response_text) == {'files': [{'path': 'a.tsx', 'content': 'b'}]}
+
+
+def test_parse_response_rejects_the_wrong_shape():
+    with pytest.raises(Exception, match=r'\$\.files\[0\]\.path'):
+        vertex_ai._parse_response('{"files": [{"path": 1, "content": "b"}]}')